@@ -0,0 +1,74 @@
+# benchmarks/auth_stub.py
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TENANT_ID = 'bench-tenant'
+
+class AuthStubServer:
+    """
+    Local HTTP stand-in for the auth service.
+    Bearer tokens starting with "valid" are accepted and mapped to
+    TENANT_ID; anything else gets a 401. Requests are counted, and the
+    count is served at /__stats so workers can report auth calls per
+    invocation.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately; don't let Nagle delay the body
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.path == '/__stats':
+                    # Read by the benchmark itself; not counted
+                    return self._send(200, {'requests': stub.requests})
+
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                token = self.headers.get('Authorization', '').replace('Bearer ', '')
+                if token.startswith('valid'):
+                    status, body = 200, {'userId': token, 'tenantId': TENANT_ID}
+                else:
+                    status, body = 401, {'error': 'Invalid token'}
+                self._send(status, body)
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/auth/validate"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
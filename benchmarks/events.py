@@ -0,0 +1,104 @@
+# benchmarks/events.py
+
+import json
+from datetime import datetime, timedelta
+from common.ids import new_item_id
+from auth_stub import TENANT_ID
+
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:abcdef1234/dev/GET/your-resource-path'
+
+# Distinct tokens cycled through by authorizer events
+AUTH_TOKENS = 100
+
+def seed_items(s3_client, count, bucket='benchmark-bucket'):
+    """
+    Write count items for the benchmark tenant, shaped like create-item's.
+    Creation times are spread over the last 30 days.
+
+    Returns:
+        List of the seeded item IDs, newest first
+    """
+    now = datetime.now()
+    item_ids = []
+    for i in range(count):
+        created = now - timedelta(minutes=i * 43200 / max(count, 1))
+        item = {
+            'id': new_item_id(created),
+            'created_at': created.isoformat(),
+            'updated_at': created.isoformat(),
+            'tenant_id': TENANT_ID,
+            'name': f'item {i}',
+            'description': 'Seeded benchmark item'
+        }
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=f"tenants/{TENANT_ID}/{item['id']}.json",
+            Body=json.dumps(item),
+            ContentType='application/json'
+        )
+        item_ids.append(item['id'])
+    return item_ids
+
+def _api_event(method, path_parameters=None, query=None, body=None):
+    return {
+        'resource': '/your-resource-path',
+        'httpMethod': method,
+        'headers': {'Accept-Encoding': 'gzip', 'Authorization': 'Bearer valid-0'},
+        'pathParameters': path_parameters,
+        'queryStringParameters': query,
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+        'requestContext': {'authorizer': {'tenantId': TENANT_ID}}
+    }
+
+def build_event(function, i, item_ids):
+    """
+    Build the i-th synthetic API Gateway event for a function.
+
+    Args:
+        function: Function suffix, e.g. "get-items"
+        i: Invocation number, used to vary the request
+        item_ids: IDs from seed_items
+
+    Returns:
+        Event dictionary, or None if there is no scenario for the function
+    """
+    if function == 'authorizer':
+        return {
+            'type': 'REQUEST',
+            'methodArn': METHOD_ARN,
+            'headers': {'Authorization': f'Bearer valid-{i % AUTH_TOKENS}'}
+        }
+
+    if function == 'get-items':
+        # Rotate through the read patterns clients use
+        scenario = i % 4
+        if scenario == 0:
+            return _api_event('GET', query={'page': str(i % 5 + 1), 'limit': '10'})
+        if scenario == 1:
+            return _api_event('GET', query={'cursor': '', 'limit': '10'})
+        if scenario == 2:
+            ids = [item_ids[(i + n) % len(item_ids)] for n in range(10)]
+            return _api_event('GET', query={'ids': ','.join(ids)})
+        start = (datetime.now() - timedelta(days=7)).isoformat()
+        return _api_event('GET', query={'start': start, 'limit': '10'})
+
+    if function == 'create-item':
+        return _api_event('POST', body={'name': f'bench {i}', 'description': 'Created by the benchmark'})
+
+    if function == 'update-item':
+        return _api_event(
+            'PUT',
+            path_parameters={'id': item_ids[i % len(item_ids)]},
+            body={'description': f'Updated by the benchmark ({i})'}
+        )
+
+    if function == 'delete-items':
+        # Each invocation deletes a different item while the seed lasts
+        return _api_event('DELETE', path_parameters={'id': item_ids[i % len(item_ids)]})
+
+    if function == 'router':
+        # Mixed traffic through one function; deletes are left out so the seed isn't used up
+        return build_event(('get-items', 'create-item', 'update-item')[i % 3], i, item_ids)
+
+    return None
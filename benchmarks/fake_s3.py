@@ -0,0 +1,119 @@
+# benchmarks/fake_s3.py
+
+import hashlib
+import io
+import threading
+import time
+from datetime import datetime, timezone
+
+class ClientError(Exception):
+    """Mirrors the response attribute of botocore's ClientError."""
+
+    def __init__(self, code, status, operation):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation")
+        self.response = {
+            'Error': {'Code': code},
+            'ResponseMetadata': {'HTTPStatusCode': status}
+        }
+
+class FakeS3Client:
+    """
+    In-memory stand-in for the S3 client used by StorageClient.
+    Implements the operations the handlers call, including conditional
+    reads and writes, and counts calls per operation. An optional latency
+    is added to every call to approximate round trips to S3.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = {}
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _record(self, operation):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store(self, key, body):
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self._lock:
+            self.objects[key] = (body, etag, datetime.now(timezone.utc))
+        return etag
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None, IfNoneMatch=None):
+        self._record('PutObject')
+        body = Body.encode('utf-8') if isinstance(Body, str) else Body
+        existing = self.objects.get(Key)
+        if IfNoneMatch == '*' and existing:
+            raise ClientError('PreconditionFailed', 412, 'PutObject')
+        if IfMatch and (not existing or existing[1] != IfMatch):
+            raise ClientError('PreconditionFailed', 412, 'PutObject')
+        return {'ETag': self._store(Key, body)}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self._record('GetObject')
+        if Key not in self.objects:
+            raise ClientError('NoSuchKey', 404, 'GetObject')
+        body, etag, last_modified = self.objects[Key]
+        if IfNoneMatch and IfNoneMatch == etag:
+            raise ClientError('304', 304, 'GetObject')
+        return {
+            'Body': io.BytesIO(body),
+            'ETag': etag,
+            'LastModified': last_modified,
+            'ContentLength': len(body)
+        }
+
+    def head_object(self, Bucket, Key):
+        self._record('HeadObject')
+        if Key not in self.objects:
+            raise ClientError('404', 404, 'HeadObject')
+        body, etag, last_modified = self.objects[Key]
+        return {'ETag': etag, 'LastModified': last_modified, 'ContentLength': len(body)}
+
+    def delete_object(self, Bucket, Key):
+        self._record('DeleteObject')
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete):
+        self._record('DeleteObjects')
+        keys = [obj['Key'] for obj in Delete['Objects']]
+        with self._lock:
+            for key in keys:
+                self.objects.pop(key, None)
+        return {} if Delete.get('Quiet') else {'Deleted': [{'Key': key} for key in keys]}
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, StartAfter=None, ContinuationToken=None):
+        self._record('ListObjectsV2')
+        with self._lock:
+            keys = sorted(key for key in self.objects if key.startswith(Prefix))
+            after = ContinuationToken or StartAfter
+            if after:
+                keys = [key for key in keys if key > after]
+            page = keys[:MaxKeys]
+            contents = [
+                {
+                    'Key': key,
+                    'LastModified': self.objects[key][2],
+                    'ETag': self.objects[key][1],
+                    'Size': len(self.objects[key][0])
+                }
+                for key in page
+            ]
+
+        response = {'Contents': contents, 'KeyCount': len(contents), 'IsTruncated': len(keys) > MaxKeys}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
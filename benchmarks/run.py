@@ -0,0 +1,333 @@
+# benchmarks/run.py
+"""
+Benchmarks for the Lambda handlers in src/functions.
+
+For each handler this measures:
+  - init: the module import, timed in fresh interpreters, and the first
+    invocation after it (clients are created lazily, so part of the
+    cold start lands there)
+  - warm: latency of repeated invocations with synthetic API Gateway
+    events, S3 and auth calls per request, and peak RSS
+
+S3 is replaced by an in-memory fake and the auth service by a local HTTP
+stub, so results measure the handler code rather than the network; use
+--s3-latency-ms and --auth-latency-ms to approximate remote round trips.
+The fake means S3 client construction itself isn't included.
+
+Usage:
+    python benchmarks/run.py
+    python benchmarks/run.py --functions get-items create-item --iterations 500
+    python benchmarks/run.py --compare benchmarks/results/<earlier run>.json
+"""
+
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+SRC_DIR = os.path.join(REPO_DIR, 'src')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+BUCKET_NAME = 'benchmark-bucket'
+
+# Remaining time reported by the fake Lambda context
+CONTEXT_TIMEOUT_MS = 30000
+
+class LambdaContext:
+    """Minimal stand-in for the Lambda context object."""
+
+    def __init__(self, timeout_ms=CONTEXT_TIMEOUT_MS):
+        self._deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return max(int((self._deadline - time.monotonic()) * 1000), 0)
+
+def discover_functions():
+    """List the function suffixes of the handlers in src/functions."""
+    paths = glob.glob(os.path.join(SRC_DIR, 'functions', 'api-template-*.py'))
+    return sorted(os.path.basename(path)[len('api-template-'):-len('.py')] for path in paths)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'mean': sum(values) / len(values),
+        'min': min(values),
+        'max': max(values)
+    }
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def auth_stub_requests(auth_url):
+    """Read the request counter of the auth stub, or None if it isn't running."""
+    if not auth_url:
+        return None
+    stats_url = auth_url.rsplit('/', 2)[0] + '/__stats'
+    try:
+        with urllib.request.urlopen(stats_url, timeout=2) as response:
+            return json.loads(response.read())['requests']
+    except Exception:
+        return None
+
+def invoke(handler, event):
+    """Invoke a handler and return its status (HTTP code, or policy effect for authorizers)."""
+    response = handler(event, LambdaContext())
+    if 'statusCode' in response:
+        return str(response['statusCode'])
+    statements = response.get('policyDocument', {}).get('Statement', [])
+    return statements[0]['Effect'] if statements else 'unknown'
+
+def run_worker(args):
+    """
+    Benchmark one function inside this (fresh) interpreter and print the
+    results as JSON.
+    """
+    # Handler logs go to stdout; keep it free for the results
+    result_stream = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+
+    sys.path.insert(0, SRC_DIR)
+    sys.path.insert(0, BENCHMARK_DIR)
+
+    start = time.perf_counter()
+    module = importlib.import_module(f'functions.api-template-{args.worker}')
+    import_ms = (time.perf_counter() - start) * 1000
+
+    from fake_s3 import FakeS3Client
+    from events import build_event, seed_items
+    import common.storage
+
+    # S3 clients are created on first use, so every StorageClient picks up the fake
+    s3_client = FakeS3Client(latency=args.s3_latency_ms / 1000)
+    common.storage.create_s3_client = lambda max_pool_connections: s3_client
+
+    invocations = 1 + args.warmup + args.iterations
+    item_ids = []
+    if args.worker != 'authorizer':
+        # delete-items needs a fresh item for every invocation
+        seed_count = max(args.seed_items, invocations) if args.worker == 'delete-items' else args.seed_items
+        item_ids = seed_items(s3_client, seed_count, bucket=BUCKET_NAME)
+    s3_client.reset_calls()
+
+    if build_event(args.worker, 0, item_ids) is None:
+        json.dump({'function': args.worker, 'import_ms': import_ms, 'skipped': 'No benchmark events for this function'}, result_stream)
+        return
+
+    start = time.perf_counter()
+    first_status = invoke(module.handler, build_event(args.worker, 0, item_ids))
+    first_invoke_ms = (time.perf_counter() - start) * 1000
+    first_s3_calls = s3_client.total_calls()
+
+    for i in range(1, 1 + args.warmup):
+        invoke(module.handler, build_event(args.worker, i, item_ids))
+
+    s3_client.reset_calls()
+    auth_before = auth_stub_requests(os.environ.get('AUTH_API_URL'))
+    latencies = []
+    statuses = {}
+    for i in range(1 + args.warmup, invocations):
+        event = build_event(args.worker, i, item_ids)
+        start = time.perf_counter()
+        status = invoke(module.handler, event)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+    auth_after = auth_stub_requests(os.environ.get('AUTH_API_URL'))
+
+    result = {
+        'function': args.worker,
+        'import_ms': import_ms,
+        'first_invoke_ms': first_invoke_ms,
+        'first_invoke_status': first_status,
+        'first_invoke_s3_calls': first_s3_calls,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    if args.iterations:
+        result.update({
+            'iterations': args.iterations,
+            'latency_ms': summarize(latencies),
+            'status_codes': statuses,
+            's3_calls_per_request': s3_client.total_calls() / args.iterations,
+            's3_calls_by_operation': {
+                operation: count / args.iterations for operation, count in sorted(s3_client.calls.items())
+            }
+        })
+        if auth_before is not None and auth_after is not None:
+            result['auth_calls_per_request'] = (auth_after - auth_before) / args.iterations
+    json.dump(result, result_stream)
+
+def run_in_subprocess(function, args, env, iterations, warmup):
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        '--worker', function,
+        '--iterations', str(iterations),
+        '--warmup', str(warmup),
+        '--seed-items', str(args.seed_items),
+        '--s3-latency-ms', str(args.s3_latency_ms)
+    ]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark worker for {function} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout)
+
+def benchmark_function(function, args, env):
+    """Run the init and warm benchmarks for one function."""
+    cold_runs = [run_in_subprocess(function, args, env, iterations=0, warmup=0) for _ in range(args.init_runs)]
+    if any('skipped' in run for run in cold_runs):
+        return {'skipped': cold_runs[0]['skipped']}
+
+    warm = run_in_subprocess(function, args, env, iterations=args.iterations, warmup=args.warmup)
+    return {
+        'init': {
+            'runs': args.init_runs,
+            'import_ms': summarize([run['import_ms'] for run in cold_runs]),
+            'first_invoke_ms': summarize([run['first_invoke_ms'] for run in cold_runs]),
+            'first_invoke_s3_calls': cold_runs[0]['first_invoke_s3_calls'],
+            'peak_rss_mb': max(run['peak_rss_mb'] for run in cold_runs)
+        },
+        'warm': {
+            key: warm[key] for key in (
+                'iterations', 'latency_ms', 'status_codes', 's3_calls_per_request',
+                's3_calls_by_operation', 'auth_calls_per_request', 'peak_rss_mb'
+            ) if key in warm
+        }
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def format_ms(value):
+    return '-' if value is None else f"{value:.2f}"
+
+def print_summary(results):
+    print(f"{'function':<16}{'import p50':>12}{'1st call p50':>14}{'warm p50':>10}{'p95':>10}{'p99':>10}{'S3/req':>8}{'RSS MB':>8}")
+    for function, result in results['functions'].items():
+        if 'skipped' in result:
+            print(f"{function:<16}  skipped: {result['skipped']}")
+            continue
+        init, warm = result['init'], result['warm']
+        latency = warm.get('latency_ms') or {}
+        print(
+            f"{function:<16}"
+            f"{format_ms(init['import_ms']['p50']):>12}"
+            f"{format_ms(init['first_invoke_ms']['p50']):>14}"
+            f"{format_ms(latency.get('p50')):>10}"
+            f"{format_ms(latency.get('p95')):>10}"
+            f"{format_ms(latency.get('p99')):>10}"
+            f"{warm.get('s3_calls_per_request', 0):>8.1f}"
+            f"{max(init['peak_rss_mb'], warm['peak_rss_mb']):>8.1f}"
+        )
+
+def print_comparison(baseline, results):
+    """Print the change in the main metrics against an earlier results file."""
+    metrics = [
+        ('import p50', lambda r: r['init']['import_ms']['p50']),
+        ('first call p50', lambda r: r['init']['first_invoke_ms']['p50']),
+        ('warm p50', lambda r: (r['warm'].get('latency_ms') or {}).get('p50')),
+        ('warm p95', lambda r: (r['warm'].get('latency_ms') or {}).get('p95')),
+        ('warm p99', lambda r: (r['warm'].get('latency_ms') or {}).get('p99')),
+        ('S3 calls/req', lambda r: r['warm'].get('s3_calls_per_request'))
+    ]
+    print(f"\nCompared with {baseline.get('timestamp')} ({baseline.get('git_commit') or 'unknown commit'}):")
+    for function, result in results['functions'].items():
+        previous = baseline.get('functions', {}).get(function)
+        if not previous or 'skipped' in previous or 'skipped' in result:
+            continue
+        for name, metric in metrics:
+            old, new = metric(previous), metric(result)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            print(f"  {function:<16}{name:<16}{old:>10.2f} -> {new:>10.2f}  {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Lambda handlers locally.")
+    parser.add_argument('--functions', nargs='+', help="Function suffixes to run, e.g. get-items (default: all)")
+    parser.add_argument('--init-runs', type=int, default=5, help="Fresh interpreters used to time init")
+    parser.add_argument('--iterations', type=int, default=200, help="Measured warm invocations per function")
+    parser.add_argument('--warmup', type=int, default=10, help="Unmeasured invocations before the warm run")
+    parser.add_argument('--seed-items', type=int, default=1000, help="Items stored for the benchmark tenant")
+    parser.add_argument('--s3-latency-ms', type=float, default=0.0, help="Latency added to every fake S3 call")
+    parser.add_argument('--auth-latency-ms', type=float, default=0.0, help="Latency added to every auth stub request")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    from auth_stub import AuthStubServer
+
+    auth_stub = AuthStubServer(latency=args.auth_latency_ms / 1000).start()
+    env = {
+        **os.environ,
+        'PRIMARY_BUCKET': BUCKET_NAME,
+        'AUTH_API_URL': auth_stub.url,
+        'AUTH_MODE': 'remote',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING')
+    }
+
+    timestamp = datetime.now(timezone.utc)
+    results = {
+        'timestamp': timestamp.isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            key: getattr(args, key) for key in (
+                'init_runs', 'iterations', 'warmup', 'seed_items', 's3_latency_ms', 'auth_latency_ms'
+            )
+        },
+        'functions': {}
+    }
+
+    try:
+        for function in args.functions or discover_functions():
+            print(f"Benchmarking {function}...", file=sys.stderr)
+            results['functions'][function] = benchmark_function(function, args, env)
+    finally:
+        auth_stub.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{timestamp.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print_summary(results)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+    print(f"\nResults saved to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,8 @@ import pulumi_aws as aws
 import json
 import time
 import logging
+from contextlib import contextmanager
+from importlib import metadata
 from pulumi import automation as auto
 from pulumi.automation import LocalWorkspaceOptions, ProjectSettings, ProjectBackend
 from config import (
@@ -26,6 +28,13 @@ account_id = os.getenv("AWS_ACCOUNT_ID", ECR_CONFIG["account_id"])
 ecr_repository = os.getenv("REPO_NAME", ECR_CONFIG["repository"])
 api_name = os.getenv("API_NAME", API_CONFIG["name"])
 states_bucket = os.getenv("PULUMI_STATE_BUCKET")
+# JSON file mapping function names to image digests, written by the image build
+image_manifest = os.getenv("IMAGE_MANIFEST")
+
+# Deploy tuning
+deploy_preview = os.getenv("DEPLOY_PREVIEW", "true").lower() == "true"  # Preview first; skip the update when nothing changed
+deploy_parallel = int(os.getenv("PULUMI_PARALLEL", "0")) or None        # Concurrent resource operations (Pulumi's default when unset)
+deploy_targets = [urn.strip() for urn in os.getenv("PULUMI_TARGETS", "").split(",") if urn.strip()]  # Resource URNs to update alone
 
 # Validate required environment variables
 if not states_bucket and os.getenv("USE_AUTOMATION_API", "true").lower() == "true":
@@ -34,6 +43,84 @@ if not states_bucket and os.getenv("USE_AUTOMATION_API", "true").lower() == "tru
 if not account_id or not ecr_repository:
     logger.warning("Using values from config.py because AWS_ACCOUNT_ID or REPO_NAME not set in environment variables.")
 
+def authorized_routes():
+    """List the "METHOD/path" routes in API_ENDPOINTS that go through the authorizer."""
+    return [
+        f"{method_config['http_method']}/{resource_config['path']}"
+        for resource_config in API_ENDPOINTS["resources"]
+        for method_config in resource_config["methods"]
+        if method_config.get("requires_auth", True)
+    ]
+
+def router_routes(function_name):
+    """
+    Map the API_ENDPOINTS methods served by a router function to the handlers
+    it should dispatch them to, as {"METHOD /path": "handler"}.
+    """
+    return {
+        f"{method_config['http_method']} /{resource_config['path']}": method_config["handler"]
+        for resource_config in API_ENDPOINTS["resources"]
+        for method_config in resource_config["methods"]
+        if method_config["function"] == function_name and method_config.get("handler")
+    }
+
+def load_image_digests():
+    """Read {function name: "sha256:..."} from IMAGE_MANIFEST, if one was given."""
+    if not image_manifest:
+        return {}
+    with open(image_manifest) as f:
+        digests = json.load(f)
+    logger.info(f"Using image digests for {len(digests)} functions from {image_manifest}")
+    return digests
+
+def image_uri(function_name, image_digests):
+    """
+    Reference a function's image by digest rather than by its mutable tag.
+    Digests missing from the manifest are looked up in ECR from the tag.
+    """
+    digest = image_digests.get(function_name)
+    if not digest:
+        digest = aws.ecr.get_image(repository_name=ecr_repository, image_tag=function_name).image_digest
+    return f"{account_id}.dkr.ecr.{region}.amazonaws.com/{ecr_repository}@{digest}"
+
+# Alias that API Gateway invokes on functions with provisioned concurrency
+PROVISIONED_ALIAS = "live"
+
+def provisioned_concurrency(function_config):
+    """
+    Normalize a function's "provisioned_concurrency" setting.
+    Accepts a number of environments, or a dict with "min", "max" and
+    "target_utilization" to scale between min and max on utilization.
+    Returns None when provisioned concurrency isn't configured.
+    """
+    setting = function_config.get("provisioned_concurrency")
+    if not setting:
+        return None
+    if not isinstance(setting, dict):
+        setting = {"min": setting}
+    minimum = setting.get("min", 1)
+    return {
+        "min": minimum,
+        "max": max(setting.get("max", minimum), minimum),
+        "target_utilization": setting.get("target_utilization", 0.7)
+    }
+
+def caching_enabled(method_config):
+    """Check whether the stage should cache a method's responses."""
+    return bool(method_config.get("caching_enabled")) and method_config["http_method"] == "GET"
+
+def cache_key_parameters(method_config):
+    """
+    Request parameters that identify a cached response: the method's query
+    parameters, the Authorization header so tenants never share entries, and
+    Accept-Encoding because handlers gzip responses for clients that accept it.
+    """
+    return [
+        *(f"method.request.querystring.{parameter}" for parameter in method_config.get("query_parameters", [])),
+        "method.request.header.Authorization",
+        "method.request.header.Accept-Encoding"
+    ]
+
 def pulumi_program():
     """Define the infrastructure using Pulumi's declarative approach.
     This function wraps your existing Pulumi code.
@@ -80,8 +167,14 @@ def pulumi_program():
             ]
         }))
 
+    # Digests of the images built for this deploy, if the build passed them in
+    image_digests = load_image_digests()
+    
     # Dictionary to store Lambda functions
     lambda_functions = {}
+    # What API Gateway invokes for each function: the function itself, or its alias
+    lambda_targets = {}
+    authorizer_function_name = f"api-{api_name}-authorizer"
     
     # Create Lambda functions for each function in config
     for function_config in LAMBDA_CONFIG["functions"]:
@@ -90,27 +183,97 @@ def pulumi_program():
         base_name = function_name.replace(f"api-{api_name}-", "")
         resource_name = f"{api_name}-{base_name}-function"
         
-        # Add timestamp to force updates
         env_vars = function_config.get("environment_variables", {}).copy()
-        env_vars["DEPLOY_TIMESTAMP"] = str(int(time.time()))
+        
+        # Let the authorizer scope its cached policies beyond the method that was called
+        if function_name == authorizer_function_name:
+            env_vars.setdefault("POLICY_SCOPE", API_CONFIG.get("policy_scope", "method"))
+            env_vars.setdefault("AUTHORIZED_ROUTES", json.dumps(authorized_routes()))
+        
+        # Tell a router function which handler serves each of its routes
+        routes = router_routes(function_name)
+        if routes:
+            env_vars.setdefault("ROUTES", json.dumps(routes))
+        
+        # Optional performance settings
+        provisioned = provisioned_concurrency(function_config)
+        function_options = {}
+        if function_config.get("reserved_concurrency") is not None:
+            function_options["reserved_concurrent_executions"] = function_config["reserved_concurrency"]
+        if function_config.get("ephemeral_storage"):
+            function_options["ephemeral_storage"] = {"size": function_config["ephemeral_storage"]}
         
         # Create Lambda function
         function = aws.lambda_.Function(resource_name,
             package_type="Image",
-            image_uri=f"{account_id}.dkr.ecr.{region}.amazonaws.com/{ecr_repository}:{function_name}",
+            # Pinned by digest, so only functions whose image changed are updated
+            image_uri=image_uri(function_name, image_digests),
             role=lambda_role.arn,
             timeout=function_config.get("timeout", 30),
             memory_size=function_config.get("memory", 2048),
+            architectures=function_config.get("architectures", ["x86_64"]),
+            # Provisioned concurrency needs a published version behind an alias
+            publish=provisioned is not None,
             environment={
                 "variables": env_vars
-            })
+            },
+            **function_options)
         
         # Store function in dictionary with original name as key
         lambda_functions[function_name] = function
+        lambda_targets[function_name] = {
+            "invoke_arn": function.invoke_arn,
+            "permission": {"function": function.arn.apply(lambda arn: arn)}
+        }
+        
+        if provisioned:
+            # API Gateway invokes the alias, so requests land on the provisioned environments
+            alias = aws.lambda_.Alias(f"{resource_name}-alias",
+                name=PROVISIONED_ALIAS,
+                function_name=function.name,
+                function_version=function.version)
+            lambda_targets[function_name] = {
+                "invoke_arn": alias.invoke_arn,
+                "permission": {"function": function.name, "qualifier": alias.name}
+            }
+            
+            autoscaled = provisioned["max"] > provisioned["min"]
+            provisioned_config = aws.lambda_.ProvisionedConcurrencyConfig(f"{resource_name}-provisioned-concurrency",
+                function_name=function.name,
+                qualifier=alias.name,
+                provisioned_concurrent_executions=provisioned["min"],
+                # When autoscaled, Application Auto Scaling adjusts the value between
+                # deployments; a fixed count is managed here so config changes apply
+                opts=pulumi.ResourceOptions(
+                    ignore_changes=["provisioned_concurrent_executions"] if autoscaled else None
+                ))
+            
+            if autoscaled:
+                scaling_target = aws.appautoscaling.Target(f"{resource_name}-concurrency-target",
+                    service_namespace="lambda",
+                    scalable_dimension="lambda:function:ProvisionedConcurrency",
+                    resource_id=pulumi.Output.concat("function:", function.name, ":", alias.name),
+                    min_capacity=provisioned["min"],
+                    max_capacity=provisioned["max"],
+                    opts=pulumi.ResourceOptions(depends_on=[provisioned_config]))
+                
+                aws.appautoscaling.Policy(f"{resource_name}-concurrency-policy",
+                    policy_type="TargetTrackingScaling",
+                    service_namespace=scaling_target.service_namespace,
+                    scalable_dimension=scaling_target.scalable_dimension,
+                    resource_id=scaling_target.resource_id,
+                    target_tracking_scaling_policy_configuration={
+                        "target_value": provisioned["target_utilization"],
+                        "predefined_metric_specification": {
+                            "predefined_metric_type": "LambdaProvisionedConcurrencyUtilization"
+                        }
+                    })
 
     # Create API Gateway
     api = aws.apigateway.RestApi(f"{api_name}-api",
         description=API_CONFIG["description"],
+        # Lets handlers return gzip-compressed, base64-encoded bodies
+        binary_media_types=API_CONFIG.get("binary_media_types", []),
         endpoint_configuration={
             "types": "REGIONAL"
         },
@@ -126,12 +289,11 @@ def pulumi_program():
 
     # Create authorizer if an authorizer function is present
     authorizer = None
-    authorizer_function_name = f"api-{api_name}-authorizer"
     if authorizer_function_name in lambda_functions:
         authorizer = aws.apigateway.Authorizer(f"{api_name}-api-authorizer",
             rest_api=api.id,
             type="REQUEST",
-            authorizer_uri=lambda_functions[authorizer_function_name].invoke_arn,
+            authorizer_uri=lambda_targets[authorizer_function_name]["invoke_arn"],
             authorizer_credentials=lambda_role.arn,
             identity_source="method.request.header.Authorization",
             authorizer_result_ttl_in_seconds=3600,
@@ -139,6 +301,8 @@ def pulumi_program():
 
     # Dictionary to store API resources
     api_resources = {}
+    # (path, method, config) of the methods whose responses the stage caches
+    cached_methods = []
     
     # Create API resources and methods for each resource in config
     for resource_config in API_ENDPOINTS["resources"]:
@@ -189,6 +353,9 @@ def pulumi_program():
             request_templates={
                 "application/json": """{"statusCode": 200}"""
             },
+            # With binary media types such as "*/*" a preflight request would otherwise
+            # reach the mapping template as binary and fail
+            content_handling="CONVERT_TO_TEXT",
             opts=pulumi.ResourceOptions(depends_on=[options_method]))
         
         # Determine allowed methods for CORS
@@ -205,6 +372,7 @@ def pulumi_program():
                 "method.response.header.Access-Control-Allow-Methods": allowed_methods_str,
                 "method.response.header.Access-Control-Allow-Origin": "'*'"
             },
+            content_handling="CONVERT_TO_TEXT",
             opts=pulumi.ResourceOptions(depends_on=[
                 options_method,
                 options_integration,
@@ -224,7 +392,12 @@ def pulumi_program():
                 authorization="CUSTOM" if method_config.get("requires_auth", True) and authorizer else "NONE",
                 authorizer_id=authorizer.id if method_config.get("requires_auth", True) and authorizer else None,
                 request_parameters={
-                    "method.request.header.Authorization": method_config.get("requires_auth", True)
+                    "method.request.header.Authorization": method_config.get("requires_auth", True),
+                    **{
+                        f"method.request.querystring.{parameter}": False
+                        for parameter in method_config.get("query_parameters", [])
+                    },
+                    **({"method.request.header.Accept-Encoding": False} if caching_enabled(method_config) else {})
                 })
             
             # Create integration
@@ -234,19 +407,24 @@ def pulumi_program():
                 http_method=method.http_method,
                 integration_http_method="POST",
                 type="AWS_PROXY",
-                uri=lambda_functions[function_name].invoke_arn,
-                credentials=lambda_role.arn)
+                uri=lambda_targets[function_name]["invoke_arn"],
+                credentials=lambda_role.arn,
+                cache_key_parameters=cache_key_parameters(method_config) if caching_enabled(method_config) else None)
+            
+            if caching_enabled(method_config):
+                cached_methods.append((resource_path, http_method, method_config))
             
-            # Create Lambda permission for API Gateway
+            # Create Lambda permission for API Gateway; the path keeps names unique
+            # when one function (e.g. a router) serves the same method on several resources
             permission = aws.lambda_.Permission(
-                f"{function_name}-{http_method}-permission",
+                f"{function_name}-{http_method}-{resource_path}-permission",
                 action="lambda:InvokeFunction",
-                function=lambda_functions[function_name].arn.apply(lambda arn: arn),
                 principal="apigateway.amazonaws.com",
                 source_arn=pulumi.Output.all(api_id=api.id, stage=API_CONFIG["stage_name"]).apply(
                     lambda args: f"arn:aws:execute-api:{region}:{account_id}:{args['api_id']}/{args['stage']}/{http_method}/{resource_path}"
                 ),
-                opts=pulumi.ResourceOptions(depends_on=[api, lambda_functions[function_name]])
+                opts=pulumi.ResourceOptions(depends_on=[api, lambda_functions[function_name]]),
+                **lambda_targets[function_name]["permission"]
             )
 
     # Create deployment with dependencies on all resources and methods
@@ -261,19 +439,36 @@ def pulumi_program():
     stage = aws.apigateway.Stage(f"{api_name}-api-stage",
         deployment=deployment.id,
         rest_api=api.id,
-        stage_name=API_CONFIG["stage_name"])
+        stage_name=API_CONFIG["stage_name"],
+        cache_cluster_enabled=bool(API_CONFIG.get("cache_cluster_size")),
+        cache_cluster_size=API_CONFIG.get("cache_cluster_size"))
+    
+    # Turn on response caching for the methods that ask for it
+    if cached_methods and not API_CONFIG.get("cache_cluster_size"):
+        logger.warning("Methods have caching_enabled but API_CONFIG has no cache_cluster_size; responses won't be cached.")
+    for resource_path, http_method, method_config in cached_methods:
+        aws.apigateway.MethodSettings(f"{http_method.lower()}-{resource_path}-cache-settings",
+            rest_api=api.id,
+            stage_name=stage.stage_name,
+            method_path=f"{resource_path}/{http_method}",
+            settings={
+                "caching_enabled": True,
+                "cache_ttl_in_seconds": method_config.get("cache_ttl", 300),
+                # Clients can't bypass the cache with Cache-Control: max-age=0 unless authorized
+                "require_authorization_for_cache_control": True
+            })
 
     # Permission for authorizer if it exists
     if authorizer:
         auth_permission = aws.lambda_.Permission(
             f"{api_name}-authorizer-permission",
             action="lambda:InvokeFunction",
-            function=lambda_functions[authorizer_function_name].arn.apply(lambda arn: arn),
             principal="apigateway.amazonaws.com",
             source_arn=pulumi.Output.all(api_id=api.id).apply(
                 lambda args: f"arn:aws:execute-api:{region}:{account_id}:{args['api_id']}/authorizers/*"
             ),
-            opts=pulumi.ResourceOptions(depends_on=[api, lambda_functions[authorizer_function_name]])
+            opts=pulumi.ResourceOptions(depends_on=[api, lambda_functions[authorizer_function_name]]),
+            **lambda_targets[authorizer_function_name]["permission"]
         )
 
     # Export the API endpoint URL
@@ -281,6 +476,45 @@ def pulumi_program():
         "https://", api.id, ".execute-api.", region, ".amazonaws.com/", stage.stage_name
     ))
 
+@contextmanager
+def phase(name):
+    """Log how long a deploy phase takes."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(f"{name} took {time.perf_counter() - start:.1f}s")
+
+def ensure_aws_plugin(stack):
+    """
+    Install the AWS resource plugin matching the installed pulumi-aws package,
+    unless that version is already installed.
+    """
+    try:
+        version = f"v{metadata.version('pulumi-aws')}"
+    except metadata.PackageNotFoundError:
+        logger.warning("pulumi-aws is not installed; leaving plugin installation to Pulumi")
+        return
+    
+    installed = {
+        plugin.version.lstrip("v")
+        for plugin in stack.workspace.list_plugins()
+        if plugin.name == "aws" and plugin.kind == "resource" and plugin.version
+    }
+    if version.lstrip("v") in installed:
+        logger.info(f"AWS plugin {version} is already installed")
+        return
+    
+    logger.info(f"Installing AWS plugin {version}...")
+    stack.workspace.install_plugin("aws", version)
+
+def has_changes(change_summary):
+    """Check whether a preview's change summary contains anything but unchanged resources."""
+    return any(
+        count and getattr(operation, "value", operation) != "same"
+        for operation, count in change_summary.items()
+    )
+
 def deploy_infra():
     """
     Deploy the infrastructure using Pulumi Automation API.
@@ -319,37 +553,58 @@ def deploy_infra():
     try:
         logger.info(f"Creating or selecting the Pulumi stack '{stack_name}'...")
         
-        # First try to select the stack if it exists
-        try:
-            stack = auto.select_stack(
-                stack_name=stack_name,
-                project_name=project_name,
-                program=pulumi_program,
-                opts=ws_opts
-            )
-            logger.info(f"Selected existing stack '{stack_name}'")
-        except Exception as e:
-            logger.info(f"Stack selection failed: {str(e)}, trying to create new stack")
-            # If selection fails, create a new stack
-            stack = auto.create_stack(
-                stack_name=stack_name,
-                project_name=project_name,
-                program=pulumi_program,
-                opts=ws_opts
-            )
-            logger.info(f"Created new stack '{stack_name}'")
+        with phase("Stack selection"):
+            # First try to select the stack if it exists
+            try:
+                stack = auto.select_stack(
+                    stack_name=stack_name,
+                    project_name=project_name,
+                    program=pulumi_program,
+                    opts=ws_opts
+                )
+                logger.info(f"Selected existing stack '{stack_name}'")
+            except Exception as e:
+                logger.info(f"Stack selection failed: {str(e)}, trying to create new stack")
+                # If selection fails, create a new stack
+                stack = auto.create_stack(
+                    stack_name=stack_name,
+                    project_name=project_name,
+                    program=pulumi_program,
+                    opts=ws_opts
+                )
+                logger.info(f"Created new stack '{stack_name}'")
 
         # Configure AWS region
         logger.info(f"Configuring AWS region '{region}' for the stack...")
         stack.set_config("aws:region", auto.ConfigValue(value=region))
 
         # Ensure required plugins are installed
-        logger.info("Installing AWS plugin...")
-        stack.workspace.install_plugin("aws", "v4.0.0")
+        with phase("Plugin check"):
+            ensure_aws_plugin(stack)
+
+        update_options = {"parallel": deploy_parallel}
+        if deploy_targets:
+            logger.info(f"Limiting the update to {len(deploy_targets)} targets and their dependents")
+            update_options.update(target=deploy_targets, target_dependents=True)
+
+        # Skip the update when the preview finds nothing to change
+        if deploy_preview:
+            logger.info("Previewing changes...")
+            with phase("Preview"):
+                preview_res = stack.preview(on_output=print, **update_options)
+            summary = {getattr(operation, "value", operation): count for operation, count in preview_res.change_summary.items()}
+            logger.info(f"Preview summary: {summary}")
+            if not has_changes(preview_res.change_summary):
+                logger.info("No changes to deploy; skipping the update")
+                outputs = stack.outputs()
+                if 'api_url' in outputs:
+                    logger.info(f"API URL: {outputs.get('api_url').value}")
+                return None
 
         # Deploy the infrastructure
         logger.info("Deploying infrastructure...")
-        up_res = stack.up(on_output=print)
+        with phase("Update"):
+            up_res = stack.up(on_output=print, **update_options)
         
         logger.info("Deployment complete!")
         if 'api_url' in up_res.outputs:
@@ -366,7 +621,8 @@ def deploy_infra():
 # Main entry point
 if __name__ == "__main__":
     try:
-        deploy_infra()
+        with phase("Deployment"):
+            deploy_infra()
     except Exception as e:
         logger.error(f"Infrastructure deployment failed: {str(e)}")
         # Exit with error code for CI/CD pipeline to detect failure
@@ -9,7 +9,15 @@ API_CONFIG = {
     "name": "your-api-name",  # Change to your API name (e.g., "ba", "inventory", etc.)
     "description": "Your API Description",
     "stage_name": "dev",      # Deployment stage (dev, prod, etc.)
-    "region": "us-east-1"     # AWS region
+    "region": "us-east-1",    # AWS region
+    # What cached authorizer results cover: "method" (only the method called),
+    # "routes" (every authorized route in API_ENDPOINTS) or "api" (the whole stage)
+    "policy_scope": "method",
+    # Media types API Gateway treats as binary; "*/*" is needed for gzip-encoded responses
+    "binary_media_types": ["*/*"],
+    # Stage cache size in GB ("0.5", "1.6", "6.1", ...) for methods with caching_enabled;
+    # None disables the cache cluster, which is billed per hour while it exists
+    "cache_cluster_size": None
 }
 
 # ECR Repository Configuration
@@ -32,9 +40,23 @@ LAMBDA_CONFIG = {
             "name": "api-your-api-name-authorizer",
             "memory": 2048,
             "timeout": 30,
+            # Optional performance settings, available on every function:
+            # "architectures": ["arm64"],       # Default ["x86_64"]; the image must be built for the same platform
+            # "reserved_concurrency": 100,      # Cap on concurrent executions reserved for this function
+            # "provisioned_concurrency": 2,     # Environments kept initialized, or scale them on utilization:
+            # "provisioned_concurrency": {"min": 2, "max": 20, "target_utilization": 0.7},
+            # "ephemeral_storage": 1024,        # /tmp size in MB (512-10240)
             "environment_variables": {
                 # Add any environment variables needed by your authorizer
-                "AUTH_API_URL": "https://your-auth-api-url.example.com"
+                "AUTH_API_URL": "https://your-auth-api-url.example.com",
+                "AUTH_MODE": "remote",  # "jwt" verifies signed tokens locally using AUTH_CONFIG["jwks_url"]
+                # "jwt" mode also requires the expected audience and issuer, and tokens
+                # must carry the tenant claim (AUTH_TENANT_CLAIM, default "tenantId"):
+                # "AUTH_JWKS_URL": "https://your-auth-domain.example.com/.well-known/jwks.json",
+                # "AUTH_JWT_AUDIENCE": "your-api-audience",
+                # "AUTH_JWT_ISSUER": "https://your-auth-domain.example.com/",
+                "LOG_LEVEL": "INFO",
+                "LOG_SAMPLE_RATES": "INFO=0.1"  # Keep 10% of INFO records; WARNING and ERROR are always kept
             }
         },
         {
@@ -47,6 +69,16 @@ LAMBDA_CONFIG = {
                 "EXAMPLE_API_URL": "https://example-api.com",
                 "LOG_LEVEL": "INFO"
             }
+        },
+        {
+            # Batch delete function (deletes by ID, ID list or date range)
+            "name": "api-your-api-name-delete-items",
+            "memory": 1024,
+            "timeout": 60,
+            "environment_variables": {
+                "MAX_DELETE_ITEMS": "10000",  # Upper bound on items removed by one request
+                "LOG_LEVEL": "INFO"
+            }
         }
         # Add more Lambda functions as needed for your API
     ]
@@ -63,8 +95,22 @@ API_ENDPOINTS = {
                     # HTTP method configuration
                     "http_method": "POST",  # or "GET", "PUT", "DELETE", etc.
                     "function": "api-your-api-name-main",  # Lambda function name from LAMBDA_CONFIG
+                    # To serve several routes from one function, point them at a router
+                    # (e.g. "api-your-api-name-router") and name the handler for each:
+                    # "handler": "create-item",
                     "requires_auth": True,  # Set to False if no authorization required
-                    "query_parameters": []  # Add query parameters if needed
+                    "query_parameters": [],  # Add query parameters if needed
+                    # GET methods can be cached by the stage (needs API_CONFIG["cache_cluster_size"]).
+                    # query_parameters, the Authorization header and Accept-Encoding form the cache key.
+                    # "caching_enabled": True,
+                    # "cache_ttl": 300,  # Seconds; writes don't invalidate, so reads may be this stale
+                },
+                {
+                    "http_method": "DELETE",
+                    "function": "api-your-api-name-delete-items",
+                    "requires_auth": True,
+                    # Items are selected by "ids" (comma separated) or a start/end date range
+                    "query_parameters": ["ids", "start", "end"]
                 }
                 # Add more methods as needed (GET, PUT, DELETE, etc.)
             ],
@@ -77,5 +123,10 @@ API_ENDPOINTS = {
 
 # Auth Configuration 
 AUTH_CONFIG = {
-    "auth_api_url": "https://your-auth-api-url.example.com"
+    "auth_api_url": "https://your-auth-api-url.example.com",
+    # Used when AUTH_MODE is "jwt" to verify signed tokens without calling the auth API;
+    # the audience and issuer are both required in that mode
+    "jwks_url": "",      # e.g. "https://your-auth-domain.example.com/.well-known/jwks.json"
+    "jwt_audience": None,
+    "jwt_issuer": None
 }
\ No newline at end of file
@@ -0,0 +1,210 @@
+# scripts/build_images.py
+"""
+Build the Lambda images for the functions in LAMBDA_CONFIG.
+
+Usage:
+    python scripts/build_images.py --registry REGISTRY --repository REPO --push
+
+Images are built in parallel with BuildKit. Each function's inputs (the
+Dockerfile, its requirement manifests, src/common and its handler) are
+hashed, and the image is also tagged <function>-<hash>; when that tag
+already exists the build is skipped and the existing image is reused, so
+only changed functions are rebuilt. The digest of every function's image
+is written to a manifest that deploys read through IMAGE_MANIFEST.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_DIR, 'src')
+DOCKERFILE = os.path.join(REPO_DIR, 'docker', 'lambda.dockerfile')
+REQUIREMENTS_DIR = os.path.join(REPO_DIR, 'docker', 'requirements')
+
+sys.path.insert(0, os.path.join(REPO_DIR, 'pulumi'))
+from config import API_CONFIG, LAMBDA_CONFIG
+
+# Functions whose image runs other handlers, so all of them are inputs
+ROUTER_FUNCTIONS = ('router',)
+
+def function_suffix(function_name, api_name):
+    """Handler name of a function, e.g. "get-items" for "api-my-api-get-items"."""
+    for name in (api_name, API_CONFIG["name"]):
+        prefix = f"api-{name}-"
+        if function_name.startswith(prefix):
+            return function_name[len(prefix):]
+    return function_name
+
+def requirement_files(suffix):
+    """The function's requirement manifest and the manifests it includes with -r."""
+    files = []
+    pending = [os.path.join(REQUIREMENTS_DIR, f"{suffix}.txt")]
+    while pending:
+        path = pending.pop()
+        if path in files or not os.path.exists(path):
+            continue
+        files.append(path)
+        with open(path) as f:
+            for line in f:
+                if line.startswith('-r '):
+                    pending.append(os.path.join(os.path.dirname(path), line[3:].split('#')[0].strip()))
+    return files
+
+def source_hash(suffix, platform):
+    """Hash everything that goes into a function's image."""
+    paths = [DOCKERFILE, *requirement_files(suffix)]
+    for root, dirs, files in os.walk(os.path.join(SRC_DIR, 'common')):
+        dirs[:] = [d for d in dirs if d != '__pycache__']
+        paths += [os.path.join(root, name) for name in files if name.endswith('.py')]
+    functions_dir = os.path.join(SRC_DIR, 'functions')
+    for name in os.listdir(functions_dir):
+        if name == '__init__.py' or name == f"api-template-{suffix}.py" or (
+            suffix in ROUTER_FUNCTIONS and name.endswith('.py')
+        ):
+            paths.append(os.path.join(functions_dir, name))
+
+    digest = hashlib.sha256(f"{suffix}\0{platform}\0".encode('utf-8'))
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, REPO_DIR).encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def existing_digest(image, push):
+    """Digest of an image that has already been built, or None."""
+    if push:
+        command = ['docker', 'buildx', 'imagetools', 'inspect', image, '--format', '{{json .Manifest}}']
+    else:
+        command = ['docker', 'image', 'inspect', image, '--format', '{{json .}}']
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    details = json.loads(result.stdout)
+    return details.get('digest') or details.get('Id')
+
+def build(function, args):
+    """Build one function's image, or reuse it if its inputs haven't changed."""
+    start = time.time()
+    suffix = function['suffix']
+    image = f"{args.registry}/{args.repository}" if args.registry else args.repository
+    hashed_tag = f"{image}:{function['name']}-{function['hash']}"
+
+    digest = None if args.force else existing_digest(hashed_tag, args.push)
+    if digest:
+        if args.push:
+            # Point the plain tag at the reused image as well
+            subprocess.run(
+                ['docker', 'buildx', 'imagetools', 'create', '--tag', f"{image}:{function['name']}", hashed_tag],
+                capture_output=True, text=True, check=True
+            )
+        return {**function, 'digest': digest, 'built': False, 'seconds': time.time() - start}
+
+    metadata_file = os.path.join(args.work_dir, f"{function['name']}.metadata.json")
+    cache_ref = f"{image}:buildcache-{suffix}"
+    command = [
+        'docker', 'buildx', 'build',
+        '--file', DOCKERFILE,
+        '--platform', function['platform'],
+        '--build-arg', f"FUNCTION_NAME={suffix}",
+        '--tag', f"{image}:{function['name']}",
+        '--tag', hashed_tag,
+        '--metadata-file', metadata_file,
+        # Lambda needs a plain image manifest, not an index with attestations
+        '--provenance=false',
+        '--push' if args.push else '--load'
+    ]
+    if args.push:
+        # Layer cache kept in the registry, for builders that start empty (e.g. CI).
+        # ECR only accepts the cache exported as an OCI image manifest.
+        command += [
+            '--cache-from', f"type=registry,ref={cache_ref}",
+            '--cache-to', f"type=registry,ref={cache_ref},mode=max,image-manifest=true,oci-mediatypes=true"
+        ]
+    command.append(REPO_DIR)
+
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Build failed for {function['name']}:\n{result.stderr[-4000:]}")
+
+    with open(metadata_file) as f:
+        digest = json.load(f).get('containerimage.digest')
+    return {**function, 'digest': digest or existing_digest(hashed_tag, args.push), 'built': True, 'seconds': time.time() - start}
+
+def main():
+    parser = argparse.ArgumentParser(description="Build Lambda images for the functions in LAMBDA_CONFIG.")
+    parser.add_argument('--registry', default=os.getenv('ECR_REGISTRY', ''), help="Image registry, e.g. the ECR registry host")
+    parser.add_argument('--repository', default=os.getenv('ECR_REPOSITORY', 'lambda-images'), help="Image repository name")
+    parser.add_argument('--api-name', default=os.getenv('API_NAME', API_CONFIG["name"]), help="API name used in function names")
+    parser.add_argument('--push', action='store_true', help="Push images to the registry instead of loading them locally")
+    parser.add_argument('--jobs', type=int, default=int(os.getenv('BUILD_JOBS', '4')), help="Images built at the same time")
+    parser.add_argument('--force', action='store_true', help="Rebuild functions even if their inputs haven't changed")
+    parser.add_argument('--manifest', default='image-digests.json', help="Where to write the function digest manifest")
+    parser.add_argument('--report', action='store_true', help="Print the size and import time of the images that were built")
+    parser.add_argument('--work-dir', default=os.path.join(REPO_DIR, '.build'), help="Directory for build metadata")
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    functions = []
+    for function_config in LAMBDA_CONFIG["functions"]:
+        suffix = function_suffix(function_config["name"], args.api_name)
+        if not os.path.exists(os.path.join(SRC_DIR, 'functions', f"api-template-{suffix}.py")):
+            print(f"Skipping {function_config['name']}: no handler src/functions/api-template-{suffix}.py", file=sys.stderr)
+            continue
+        if not os.path.exists(os.path.join(REQUIREMENTS_DIR, f"{suffix}.txt")):
+            print(f"Skipping {function_config['name']}: no docker/requirements/{suffix}.txt", file=sys.stderr)
+            continue
+        # Lambda architectures map to Docker platforms
+        architecture = function_config.get("architectures", ["x86_64"])[0]
+        platform = 'linux/arm64' if architecture == 'arm64' else 'linux/amd64'
+        functions.append({
+            'name': function_config["name"],
+            'suffix': suffix,
+            'platform': platform,
+            'hash': source_hash(suffix, platform)
+        })
+
+    start = time.time()
+    results = []
+    failed = False
+    with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as executor:
+        futures = [executor.submit(build, function, args) for function in functions]
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(str(e), file=sys.stderr)
+                failed = True
+                continue
+            results.append(result)
+            state = 'built' if result['built'] else 'unchanged'
+            print(f"{result['name']:<40}{state:<11}{result['seconds']:>7.1f}s  {result['digest']}")
+
+    built = sum(1 for result in results if result['built'])
+    print(f"{built} built, {len(results) - built} unchanged in {time.time() - start:.1f}s")
+
+    with open(args.manifest, 'w') as f:
+        json.dump({result['name']: result['digest'] for result in results}, f, indent=2)
+    print(f"Digest manifest written to {args.manifest}")
+
+    if args.report:
+        built_images = [
+            f"{args.registry}/{args.repository}:{result['name']}" if args.registry else f"{args.repository}:{result['name']}"
+            for result in results if result['built']
+        ]
+        if built_images:
+            subprocess.run(
+                [sys.executable, os.path.join(REPO_DIR, 'scripts', 'image_report.py'), '--api-name', args.api_name, *built_images]
+            )
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# scripts/image_report.py
+"""
+Report the size and handler import time of built Lambda images.
+
+Usage:
+    python scripts/image_report.py --api-name my-api REGISTRY/REPO:api-my-api-authorizer ...
+
+The function is taken from the image tag (api-<api name>-<function>). The
+import time is the median of several fresh interpreters inside the image,
+with the handler module imported the way the entrypoint imports it.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_SCRIPT = (
+    "import importlib, time; "
+    "start = time.perf_counter(); "
+    "importlib.import_module('functions.api-template-{function}'); "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+def image_size_mb(image):
+    size = subprocess.run(
+        ['docker', 'image', 'inspect', '--format', '{{.Size}}', image],
+        capture_output=True, text=True, check=True
+    ).stdout.strip()
+    return int(size) / (1024 * 1024)
+
+def import_time_ms(image, function, runs):
+    """Median time to import the function's handler module in the image."""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [
+                'docker', 'run', '--rm', '--entrypoint', 'python',
+                # Handlers only need a bucket name to import; clients are created on first use
+                '-e', 'PRIMARY_BUCKET=image-report',
+                '-e', 'AWS_DEFAULT_REGION=us-east-1',
+                image, '-c', IMPORT_SCRIPT.format(function=function)
+            ],
+            capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report Lambda image sizes and import times.")
+    parser.add_argument('images', nargs='+', help="Built images, tagged api-<api name>-<function>")
+    parser.add_argument('--api-name', required=True, help="API name used in the image tags")
+    parser.add_argument('--runs', type=int, default=3, help="Interpreters started per image")
+    parser.add_argument('--output', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = []
+    for image in args.images:
+        tag = image.rsplit(':', 1)[-1]
+        function = tag[len(f"api-{args.api_name}-"):] if tag.startswith(f"api-{args.api_name}-") else tag
+        try:
+            report.append({
+                'function': function,
+                'image': image,
+                # Runs first so a pushed image is pulled before its size is read
+                'import_ms': import_time_ms(image, function, args.runs),
+            })
+            report[-1]['size_mb'] = image_size_mb(image)
+        except subprocess.CalledProcessError as e:
+            print(f"Error measuring {image}: {e.stderr or e}", file=sys.stderr)
+            report.append({'function': function, 'image': image, 'error': str(e)})
+
+    print(f"{'function':<24}{'size MB':>10}{'import ms':>12}")
+    for entry in report:
+        if 'error' in entry:
+            print(f"{entry['function']:<24}{'error':>10}")
+        else:
+            print(f"{entry['function']:<24}{entry['size_mb']:>10.1f}{entry['import_ms']:>12.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if any('error' in entry for entry in report):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,190 @@
 # src/common/auth.py
 
-import requests
+import hashlib
 import json
 import os
-from config import AUTH_CONFIG  # Import from config if available
+import random
+import threading
+import time
+from collections import OrderedDict
+from common.jwks import JWKSVerifier
+
+try:
+    from config import AUTH_CONFIG  # Import from config if available
+except ImportError:  # The pulumi config isn't packaged in the Lambda image; use environment variables
+    AUTH_CONFIG = {}
+
+# Validation results are cached in the container between warm invocations
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', '300'))
+AUTH_NEGATIVE_CACHE_TTL = int(os.environ.get('AUTH_NEGATIVE_CACHE_TTL', '30'))
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', '1000'))
+# Seconds before expiry at which a cached valid token is refreshed in the background
+AUTH_REFRESH_AHEAD = int(os.environ.get('AUTH_REFRESH_AHEAD', '60'))
+
+# Status codes that mean the token itself was rejected, as opposed to a service failure
+REJECTED_STATUS_CODES = (401, 403)
+
+# Connection handling for calls to the auth service
+AUTH_CONNECT_TIMEOUT = float(os.environ.get('AUTH_CONNECT_TIMEOUT', '1'))
+AUTH_READ_TIMEOUT = float(os.environ.get('AUTH_READ_TIMEOUT', '3'))
+AUTH_POOL_SIZE = int(os.environ.get('AUTH_POOL_SIZE', '10'))
+AUTH_MAX_RETRIES = int(os.environ.get('AUTH_MAX_RETRIES', '2'))
+AUTH_RETRY_BACKOFF = float(os.environ.get('AUTH_RETRY_BACKOFF', '0.1'))
+AUTH_BREAKER_THRESHOLD = int(os.environ.get('AUTH_BREAKER_THRESHOLD', '5'))
+AUTH_BREAKER_RESET = float(os.environ.get('AUTH_BREAKER_RESET', '30'))
+
+# "remote" validates every token with the auth service; "jwt" verifies
+# signed JWTs locally against AUTH_JWKS_URL and falls back to the service
+AUTH_MODE = os.environ.get('AUTH_MODE', 'remote')
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is degraded.
+    Opens after failure_threshold consecutive failures, then lets a single
+    trial request through once reset_timeout seconds have passed.
+    """
+    
+    def __init__(self, failure_threshold=AUTH_BREAKER_THRESHOLD, reset_timeout=AUTH_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+    
+    def allow_request(self):
+        """Check whether a request may be sent now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            # Half-open: let one request through to probe the service
+            self._trial_in_flight = True
+            return True
+    
+    def record_success(self):
+        """Close the breaker after a successful request."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Count a failed request, opening the breaker at the threshold."""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class TokenCache:
+    """
+    Thread-safe LRU cache of token validation results.
+    Tokens are stored by their SHA-256 hash, never in plain text.
+    """
+    
+    def __init__(self, max_size=AUTH_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def token_hash(token):
+        """Get the cache key for a token."""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def get(self, token_hash):
+        """Get the (result, expires_at) entry for a token hash, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return entry
+    
+    def put(self, token_hash, result, ttl):
+        """Store a validation result for ttl seconds."""
+        with self._lock:
+            self._entries[token_hash] = (result, time.monotonic() + ttl)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
 
 class AuthClient:
     """
     Authentication client for validating tokens with an external auth service.
+    Results are cached so the auth service stays off the request path for
+    tokens seen recently; valid tokens are refreshed in the background
+    shortly before their cache entry expires.
+    Calls reuse pooled keep-alive connections, are retried with jittered
+    backoff on 5xx and connection errors, and fail fast through a circuit
+    breaker while the service is degraded.
+    In "jwt" mode signed JWTs are verified locally; other tokens, or JWTs
+    whose key can't be found, still go to the auth service.
     """
     
-    def __init__(self):
+    def __init__(self, cache=None, breaker=None):
         # Try to get auth API URL from environment or config
         self.auth_api_url = os.environ.get(
             'AUTH_API_URL', 
             AUTH_CONFIG.get('auth_api_url', 'https://your-auth-api-url/auth/validate')
         )
+        self.cache = cache or TokenCache()
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = (AUTH_CONNECT_TIMEOUT, AUTH_READ_TIMEOUT)
+        self._session = None
+        self._session_lock = threading.Lock()
+        
+        self.jwks_verifier = None
+        jwks_url = os.environ.get('AUTH_JWKS_URL', AUTH_CONFIG.get('jwks_url'))
+        if AUTH_MODE == 'jwt' and jwks_url:
+            algorithms = os.environ.get('AUTH_JWT_ALGORITHMS', 'RS256')
+            # Raises if the audience or issuer is missing, so the authorizer
+            # fails to start rather than accept tokens meant for other applications
+            self.jwks_verifier = JWKSVerifier(
+                jwks_url,
+                audience=os.environ.get('AUTH_JWT_AUDIENCE', AUTH_CONFIG.get('jwt_audience')),
+                issuer=os.environ.get('AUTH_JWT_ISSUER', AUTH_CONFIG.get('jwt_issuer')),
+                algorithms=[algorithm.strip() for algorithm in algorithms.split(',')],
+                timeout=self.timeout
+            )
+        
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+    
+    @property
+    def session(self):
+        """
+        HTTP session for the auth service, created on first use.
+        requests is only imported here, so JWT-mode containers that verify
+        every token locally never load it.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    
+                    # Keep connections to the auth service open between invocations
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AUTH_POOL_SIZE)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
 
     def validate_token(self, api_key: str):
         """
-        Validates a token with the authentication service.
+        Validates a token, using a cached result when one is available.
         
         Args:
             api_key: The API key or token to validate
@@ -27,30 +192,116 @@ class AuthClient:
         Returns:
             Tuple of (is_valid, error_message, user_data)
         """
+        # Strip "Bearer " prefix if present
+        if api_key.startswith('Bearer '):
+            api_key = api_key[7:]
+        
+        token_hash = TokenCache.token_hash(api_key)
+        cached = self.cache.get(token_hash)
+        if cached:
+            result, expires_at = cached
+            if result[0] and expires_at - time.monotonic() < AUTH_REFRESH_AHEAD:
+                self._refresh_in_background(api_key, token_hash)
+            return result
+        
+        return self._validate_and_cache(api_key, token_hash)
+    
+    def _validate_and_cache(self, api_key, token_hash):
+        local_result = self.jwks_verifier.verify(api_key) if self.jwks_verifier else None
+        if local_result is not None:
+            is_valid, _, user_data = local_result
+            if is_valid:
+                # Never cache a token past its own expiry
+                ttl = min(AUTH_CACHE_TTL, user_data['exp'] - time.time())
+                self.cache.put(token_hash, local_result, ttl)
+            else:
+                self.cache.put(token_hash, local_result, AUTH_NEGATIVE_CACHE_TTL)
+            return local_result
+        
+        is_valid, error, user_data, status_code = self._validate_remote(api_key)
+        result = (is_valid, error, user_data)
+        
+        if is_valid:
+            self.cache.put(token_hash, result, AUTH_CACHE_TTL)
+        elif status_code in REJECTED_STATUS_CODES:
+            # Only remember definite rejections; service errors are retried next time
+            self.cache.put(token_hash, result, AUTH_NEGATIVE_CACHE_TTL)
+        return result
+    
+    def _refresh_in_background(self, api_key, token_hash):
+        with self._refresh_lock:
+            if token_hash in self._refreshing:
+                return
+            self._refreshing.add(token_hash)
+        
+        def refresh():
+            try:
+                self._validate_and_cache(api_key, token_hash)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(token_hash)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def _validate_remote(self, api_key):
+        """
+        Validates a token with the authentication service.
+        
+        Returns:
+            Tuple of (is_valid, error_message, user_data, status_code);
+            status_code is None if the service couldn't be reached
+        """
+        if not self.breaker.allow_request():
+            return False, "Authentication service unavailable", None, None
+        
+        # Use the API key as Bearer tokens
+        headers = {
+            "Authorization": f"Bearer {api_key}"
+        }
+        
         try:
-            # Strip "Bearer " prefix if present
-            if api_key.startswith('Bearer '):
-                api_key = api_key[7:]
+            session = self.session
+            import requests  # Already loaded by the session
             
-            # Use the API key as Bearer tokens
-            headers = {
-                "Authorization": f"Bearer {api_key}"
-            }
+            response = None
+            for attempt in range(AUTH_MAX_RETRIES + 1):
+                if attempt:
+                    # Full jitter keeps retries from many containers from lining up
+                    time.sleep(random.uniform(0, AUTH_RETRY_BACKOFF * 2 ** (attempt - 1)))
+                try:
+                    response = session.get(
+                        self.auth_api_url,
+                        headers=headers,
+                        timeout=self.timeout
+                    )
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    error = f"Authentication error: {str(e)}"
+                    response = None
+                    continue
+                if response.status_code < 500:
+                    break
             
-            response = requests.get(
-                self.auth_api_url,
-                headers=headers,
-                timeout=5
-            )
+            if response is None or response.status_code >= 500:
+                self.breaker.record_failure()
+                if response is None:
+                    return False, error, None, None
+                return False, f"Token validation failed with status code: {response.status_code}", None, response.status_code
             
             if response.status_code == 200:
                 user_data = response.json()
-                return True, "", user_data
+                # Only a response that was read in full counts as a success
+                self.breaker.record_success()
+                return True, "", user_data, response.status_code
             else:
-                return False, f"Token validation failed with status code: {response.status_code}", None
+                self.breaker.record_success()
+                return False, f"Token validation failed with status code: {response.status_code}", None, response.status_code
                 
         except Exception as e:
-            return False, f"Authentication error: {str(e)}", None
+            # Any other error (a truncated or invalid body, redirect loops, ...) is a
+            # failure too; recording it also ends a half-open trial, which would
+            # otherwise keep the breaker open for the life of the container
+            self.breaker.record_failure()
+            return False, f"Authentication error: {str(e)}", None, None
     
     def get_user_info(self, api_key: str):
         """
@@ -0,0 +1,71 @@
+# src/common/ids.py
+
+import os
+import re
+from datetime import datetime
+
+# Crockford base32 alphabet used by ULIDs; sorts the same as the values it encodes
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+TIME_LENGTH = 10
+RANDOM_LENGTH = 16
+
+ID_PATTERN = re.compile(f"^[{ENCODING}]{{{TIME_LENGTH + RANDOM_LENGTH}}}$")
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ENCODING[index])
+    return ''.join(reversed(chars))
+
+def _decode(value):
+    result = 0
+    for char in value:
+        result = result * 32 + ENCODING.index(char)
+    return result
+
+def _to_millis(timestamp):
+    return int(timestamp.timestamp() * 1000)
+
+def new_item_id(timestamp=None):
+    """
+    Generate a time-ordered item ID (ULID).
+    IDs generated later sort after earlier ones, so item keys can be
+    listed by time range.
+
+    Args:
+        timestamp: Optional datetime to encode, defaults to now
+
+    Returns:
+        A 26 character ID string
+    """
+    millis = _to_millis(timestamp or datetime.now())
+    randomness = int.from_bytes(os.urandom(10), 'big')
+    return _encode(millis, TIME_LENGTH) + _encode(randomness, RANDOM_LENGTH)
+
+def item_id_from_key(prefix, key):
+    """Get the ID of the item stored at key, e.g. "ID" for "tenants/t1/ID.json"."""
+    return key[len(prefix):].rsplit('.json', 1)[0]
+
+def is_time_ordered_id(item_id):
+    """Check whether an ID was generated by new_item_id."""
+    return bool(ID_PATTERN.match(item_id or ''))
+
+def id_timestamp(item_id):
+    """Get the creation time encoded in a time-ordered ID."""
+    return datetime.fromtimestamp(_decode(item_id[:TIME_LENGTH]) / 1000)
+
+def id_bounds(start=None, end=None):
+    """
+    Convert an ISO date range into the lowest and highest IDs it can contain.
+    Returns (lower, upper); either is None when the matching date is not set.
+    Bounds are inclusive and at millisecond precision, so callers should
+    still apply their exact date filter to the items they read.
+    """
+    lower = upper = None
+    if start:
+        lower = _encode(_to_millis(datetime.fromisoformat(start)), TIME_LENGTH) + ENCODING[0] * RANDOM_LENGTH
+    if end:
+        upper = _encode(_to_millis(datetime.fromisoformat(end)), TIME_LENGTH) + ENCODING[-1] * RANDOM_LENGTH
+    return lower, upper
\ No newline at end of file
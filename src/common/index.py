@@ -0,0 +1,358 @@
+# src/common/index.py
+
+import json
+import os
+from datetime import datetime
+from common.ids import id_bounds, is_time_ordered_id, item_id_from_key, new_item_id
+from common.log import get_logger
+from common.storage import PreconditionFailed
+
+logger = get_logger(__name__)
+# Index objects live outside the item prefixes so listings never pick them up
+INDEX_PREFIX = "indexes/"
+
+# Fields stored for each item, in order; entries are kept as compact lists
+INDEX_FIELDS = ['id', 'created_at', 'updated_at', 'size']
+INDEX_VERSION = 3
+
+# Pending changes are folded into the index object once this many have accumulated
+ITEM_INDEX_COMPACT_THRESHOLD = int(os.environ.get('ITEM_INDEX_COMPACT_THRESHOLD', '20'))
+
+class ItemIndex:
+    """
+    Sorted manifest of the items stored under a prefix.
+    Lets queries paginate and count items without downloading every object.
+    Entries are kept most recently modified first (updated_at, or created_at
+    for items never updated), the same order query_items gives by S3
+    LastModified, so get-items pages the same way with or without the index.
+
+    Writers never rewrite the manifest: each create, update or delete records a
+    small change object under the prefix's changes/ folder with a single
+    PUT and no read, so concurrent writers can't conflict. Readers apply
+    the pending changes, in the order they were recorded, on top of the
+    stored index, and fold them into it once compact_threshold have
+    accumulated. Only that fold is a conditional write; when readers fold
+    at the same time one wins and the others serve what they loaded.
+
+    Contention limit: writes are bounded only by S3's request rate for the
+    prefix. Each read lists the pending changes and downloads them
+    concurrently, normally fewer than compact_threshold; a write burst
+    between two reads makes the next read download more of them, and a
+    fold then rewrites the index object once, in O(items) bytes.
+    """
+
+    def __init__(self, storage_client, max_retries=5, compact_threshold=ITEM_INDEX_COMPACT_THRESHOLD):
+        self.storage_client = storage_client
+        self.max_retries = max_retries
+        self.compact_threshold = compact_threshold
+
+    def index_key(self, prefix):
+        """Get the key of the index object for an item prefix."""
+        return f"{INDEX_PREFIX}{prefix}index.json"
+
+    def changes_prefix(self, prefix):
+        """Get the key prefix of the pending change objects for an item prefix."""
+        return f"{INDEX_PREFIX}{prefix}changes/"
+
+    def load(self, prefix):
+        """
+        Load the entries for a prefix: the stored index with the pending
+        changes applied. Builds and stores the index if there isn't one yet.
+        """
+        for attempt in range(self.max_retries):
+            last_attempt = attempt == self.max_retries - 1
+
+            # Changes are listed before the index is read. A fold that lands in
+            # between is then already in the index, or shows up below as a
+            # change that no longer exists.
+            change_keys = [meta['Key'] for meta in self.storage_client.list_items(self.changes_prefix(prefix))]
+            index, etag = self.storage_client.get_item_with_etag(self.index_key(prefix))
+            if not index:
+                entries = self.rebuild(prefix, change_keys)
+                if entries is None and not last_attempt:
+                    continue  # Another request stored an index first; load that one
+                return entries if entries is not None else self.build(prefix)
+
+            folded = set(index.get('folded', []))
+            pending = [key for key in change_keys if key not in folded]
+            changes = self.storage_client.get_items(pending)
+            if None in changes and not last_attempt:
+                # Folded and deleted by a concurrent reader; the index now has them
+                continue
+
+            fields = index.get('fields', INDEX_FIELDS)
+            entries = {}
+            for row in index.get('items', []):
+                entry = dict(zip(fields, row))
+                entries[entry['id']] = {field: entry.get(field) for field in INDEX_FIELDS}
+            self._apply(entries, [change for change in changes if change])
+            entries = self._sort(entries.values())
+
+            if len(change_keys) >= self.compact_threshold:
+                self._compact(prefix, entries, etag, change_keys)
+            return entries
+
+    def build(self, prefix):
+        """
+        Build index entries from a full scan of the items under prefix.
+        Doesn't store the result; see rebuild.
+        """
+        metas = self.storage_client.list_items(prefix)
+        items = self.storage_client.get_items([meta['Key'] for meta in metas])
+
+        entries = []
+        for meta, item in zip(metas, items):
+            if not item:
+                continue
+            entries.append({
+                **self._entry({**item, 'id': item.get('id') or item_id_from_key(prefix, meta['Key'])}),
+                'size': meta.get('Size', 0)
+            })
+        return self._sort(entries)
+
+    def rebuild(self, prefix, change_keys=None):
+        """
+        Build the index for a prefix from a full scan and store it, unless
+        another request has stored one in the meantime.
+
+        Args:
+            prefix: The item prefix the index covers
+            change_keys: Change objects listed before the scan; their items
+                were written before it, so the scan already includes them
+
+        Returns:
+            The entries, or None if an index already exists; load it instead
+        """
+        if change_keys is None:
+            change_keys = [meta['Key'] for meta in self.storage_client.list_items(self.changes_prefix(prefix))]
+        entries = self.build(prefix)
+        try:
+            # Never overwrite an index: one stored after this scan started may
+            # include items the scan missed
+            self.storage_client.write_item_conditional(
+                self._serialize(entries, change_keys), self.index_key(prefix), etag=None
+            )
+        except PreconditionFailed:
+            return None
+        return entries
+
+    def update(self, prefix, upserts=(), removals=()):
+        """
+        Record added or replaced items and removed IDs.
+        Writes one small change object; see the class docstring.
+
+        Args:
+            prefix: The item prefix the index covers
+            upserts: Item dictionaries that were written under prefix
+            removals: IDs of items that were deleted
+
+        Returns:
+            True if the change was recorded, False otherwise
+        """
+        change = {
+            'upserts': [[entry[field] for field in INDEX_FIELDS] for entry in map(self._entry, upserts)],
+            'removals': list(removals)
+        }
+        # Time-ordered names make the listing return changes in the order they were made
+        if self.storage_client.write_item(change, f"{self.changes_prefix(prefix)}{new_item_id()}.json"):
+            return True
+
+        # Drop the index so the next query rebuilds it instead of serving stale data
+        logger.warning("Failed to record index change, invalidating the index", prefix=prefix)
+        self.storage_client.delete_item(self.index_key(prefix))
+        return False
+
+    def query(self, prefix, filter_func=None, start=0, limit=100, deadline=None, after=None):
+        """
+        Query items using the index, fetching only the objects on the page.
+        filter_func is applied to index entries, which have the INDEX_FIELDS keys.
+        after is a next_position from a previous query to continue from;
+        start then counts from that position.
+        Returns the same structure as StorageClient.query_items.
+        """
+        try:
+            entries = self.load(prefix)
+
+            if filter_func:
+                entries = [entry for entry in entries if filter_func(entry)]
+            total = len(entries)
+
+            if after is not None:
+                # Entries are sorted descending, so skip everything up to the position
+                after = tuple(after)
+                entries = [entry for entry in entries if self._sort_key(entry) < after]
+
+            end = min(start + limit, len(entries))
+            page = entries[start:end]
+            page_data = self.storage_client.get_items(
+                [f"{prefix}{entry['id']}.json" for entry in page],
+                deadline=deadline
+            )
+
+            return {
+                'items': [
+                    {'metadata': entry, 'data': item_data}
+                    for entry, item_data in zip(page, page_data)
+                    if item_data
+                ],
+                'total': total,
+                'total_is_estimate': False,
+                'start': start,
+                'limit': limit,
+                'has_more': end < len(entries),
+                'next_position': list(self._sort_key(page[-1])) if end < len(entries) else None
+            }
+        except Exception as e:
+            logger.error("Error querying index", prefix=prefix, error=str(e))
+            return {
+                'items': [],
+                'total': 0,
+                'total_is_estimate': False,
+                'start': start,
+                'limit': limit,
+                'has_more': False,
+                'next_position': None,
+                'error': str(e)
+            }
+
+    def _apply(self, entries, changes):
+        """Apply change objects, in order, to entries keyed by ID."""
+        for change in changes:
+            for row in change.get('upserts', []):
+                entry = dict(zip(INDEX_FIELDS, row))
+                entries[entry['id']] = {field: entry.get(field) for field in INDEX_FIELDS}
+            for item_id in change.get('removals', []):
+                entries.pop(item_id, None)
+
+    def _compact(self, prefix, entries, etag, change_keys):
+        """Fold the listed changes into the stored index and delete them."""
+        try:
+            if not self.storage_client.write_item_conditional(
+                    self._serialize(entries, change_keys), self.index_key(prefix), etag):
+                return
+        except PreconditionFailed:
+            return  # Another reader folded them first
+        # Until they are gone the index lists them as folded, so they aren't applied twice
+        self.storage_client.delete_items(change_keys)
+
+    def _entry(self, item):
+        return {
+            'id': item['id'],
+            'created_at': item.get('created_at'),
+            'updated_at': item.get('updated_at'),
+            'size': len(json.dumps(item).encode('utf-8'))
+        }
+
+    def _sort_key(self, entry):
+        return (entry['updated_at'] or entry['created_at'] or '', entry['id'])
+
+    def _sort(self, entries):
+        return sorted(entries, key=self._sort_key, reverse=True)
+
+    def _serialize(self, entries, folded=()):
+        return {
+            'version': INDEX_VERSION,
+            'fields': INDEX_FIELDS,
+            'items': [[entry[field] for field in INDEX_FIELDS] for entry in entries],
+            # Change objects already included in items
+            'folded': list(folded)
+        }
+
+
+class LegacyKeyMap:
+    """
+    Creation times of items whose IDs are not time-ordered, such as the
+    UUID keys written before new_item_id was introduced.
+    Lets date range queries include those items without scanning the prefix.
+    New items always get time-ordered IDs, so each map is built only once.
+    """
+
+    def __init__(self, storage_client):
+        self.storage_client = storage_client
+
+    def map_key(self, prefix):
+        """Get the key of the legacy map object for an item prefix."""
+        return f"{INDEX_PREFIX}{prefix}legacy.json"
+
+    def load(self, prefix):
+        """Load the legacy map for a prefix, building it if it doesn't exist yet."""
+        legacy_map = self.storage_client.get_item(self.map_key(prefix))
+        if legacy_map is None:
+            return self.build(prefix)
+        return legacy_map.get('items', [])
+
+    def build(self, prefix):
+        """
+        Build and store the legacy map from a full scan of the prefix.
+        Entries are [key, created_at, last_modified] lists.
+        """
+        metas = [
+            meta for meta in self.storage_client.list_items(prefix)
+            if not is_time_ordered_id(item_id_from_key(prefix, meta['Key']))
+        ]
+        items = self.storage_client.get_items([meta['Key'] for meta in metas])
+
+        entries = [
+            [meta['Key'], item.get('created_at'), meta['LastModified'].isoformat()]
+            for meta, item in zip(metas, items)
+            if item
+        ]
+        self.storage_client.write_item({'version': 1, 'items': entries}, self.map_key(prefix))
+        return entries
+
+    def items_between(self, prefix, start=None, end=None):
+        """
+        Get metadata for legacy items created within a date range.
+        Items without a creation date are always included.
+        Returns dictionaries with Key and LastModified, like list_items.
+        """
+        return [
+            {'Key': key, 'LastModified': datetime.fromisoformat(last_modified)}
+            for key, created_at, last_modified in self.load(prefix)
+            if not created_at or ((not start or start <= created_at) and (not end or created_at <= end))
+        ]
+
+
+def date_filter(start=None, end=None, include_undated=True):
+    """
+    Build a filter for items, or index entries, created within a date range.
+    The date is read from created_at, date or timestamp; items with none of
+    them match only when include_undated is True.
+    Returns None when neither start nor end is set.
+    """
+    if not start and not end:
+        return None
+
+    def filter_by_date(item):
+        item_date = item.get('created_at') or item.get('date') or item.get('timestamp')
+        if not item_date:
+            return include_undated
+        return (not start or start <= item_date) and (not end or item_date <= end)
+
+    return filter_by_date
+
+def list_items_between(storage_client, prefix, start=None, end=None, legacy_key_map=None):
+    """
+    List the items under prefix that can have been created within a date range.
+    Time-ordered keys turn the range into a key range listing; items stored
+    under older UUID keys come from the legacy map.
+    Bounds are at millisecond precision and legacy items without a creation
+    date are included, so callers still apply date_filter to what they read.
+
+    Returns:
+        Metadata dictionaries with Key and LastModified, like list_items
+
+    Raises:
+        ValueError: If start or end isn't an ISO date
+    """
+    lower_id, upper_id = id_bounds(start, end)
+    items = [
+        meta for meta in storage_client.list_items(
+            prefix,
+            start_after=f"{prefix}{lower_id}" if lower_id else None,
+            end_key=f"{prefix}{upper_id}.json" if upper_id else None
+        )
+        if is_time_ordered_id(item_id_from_key(prefix, meta['Key']))
+    ]
+    legacy_key_map = legacy_key_map or LegacyKeyMap(storage_client)
+    return items + legacy_key_map.items_between(prefix, start, end)
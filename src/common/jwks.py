@@ -0,0 +1,165 @@
+# src/common/jwks.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+AUTH_JWKS_CACHE_TTL = int(os.environ.get('AUTH_JWKS_CACHE_TTL', '3600'))
+# Minimum seconds between JWKS downloads triggered by an unknown key ID
+AUTH_JWKS_MIN_REFRESH = int(os.environ.get('AUTH_JWKS_MIN_REFRESH', '60'))
+AUTH_JWKS_CACHE_DIR = os.environ.get('AUTH_JWKS_CACHE_DIR', '/tmp')
+# Claim that holds the tenant ID, exposed to the authorizer as tenantId
+AUTH_TENANT_CLAIM = os.environ.get('AUTH_TENANT_CLAIM', 'tenantId')
+
+def _import_jwt():
+    """
+    Import PyJWT on first use; it pulls in cryptography, which is costly
+    to load and only needed when local verification is enabled.
+    """
+    try:
+        import jwt
+    except ImportError:
+        return None
+    return jwt
+
+class JWKSVerifier:
+    """
+    Verifies signed JWTs locally against a JSON Web Key Set.
+    The key set is cached in memory and on disk under /tmp so new containers
+    on the same instance can skip the download, and is refreshed when a
+    token names a key ID that isn't known yet.
+    An audience and an issuer are required: without them any token signed
+    by the identity provider's keys, including ones issued for other
+    applications, would be accepted.
+    """
+
+    def __init__(self, jwks_url, audience, issuer, algorithms=None, session=None, timeout=5):
+        if not audience or not issuer:
+            raise ValueError("JWT verification requires both an audience and an issuer")
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.issuer = issuer
+        self.algorithms = algorithms or ['RS256']
+        self.session = session
+        self.timeout = timeout
+        self.cache_path = os.path.join(
+            AUTH_JWKS_CACHE_DIR,
+            f"jwks-{hashlib.sha256(jwks_url.encode('utf-8')).hexdigest()[:16]}.json"
+        )
+        self._keys = None
+        self._fetched_at = 0
+        self._last_attempt = 0
+        self._lock = threading.Lock()
+
+    def verify(self, token):
+        """
+        Verify a token's signature and its exp, aud and iss claims.
+        Tokens without the AUTH_TENANT_CLAIM claim are rejected.
+
+        Args:
+            token: The token, without the "Bearer " prefix
+
+        Returns:
+            Tuple of (is_valid, error_message, user_data), or None if the
+            token can't be checked locally and should be validated remotely
+        """
+        jwt = _import_jwt()
+        if jwt is None:
+            return None
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError:
+            # Not a JWT, e.g. an opaque API key
+            return None
+
+        key = self._get_key(header.get('kid'))
+        if key is None:
+            return None
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                options={'require': ['exp', 'aud', 'iss']}
+            )
+        except jwt.InvalidTokenError as e:
+            return False, f"Token validation failed: {str(e)}", None
+
+        if not claims.get(AUTH_TENANT_CLAIM):
+            # Without a tenant the handlers would fall back to the shared items/ prefix
+            return False, f"Token has no {AUTH_TENANT_CLAIM} claim", None
+
+        user_data = dict(claims)
+        user_data['tenantId'] = claims.get(AUTH_TENANT_CLAIM)
+        return True, "", user_data
+
+    def _get_key(self, kid):
+        with self._lock:
+            # Downloads are rate limited so a bad kid or an unreachable
+            # JWKS endpoint can't turn every request into a fetch
+            can_fetch = time.time() - self._last_attempt > AUTH_JWKS_MIN_REFRESH
+
+            if self._keys is None or time.time() - self._fetched_at > AUTH_JWKS_CACHE_TTL:
+                if not self._load_from_disk() and can_fetch:
+                    self._fetch()
+            elif kid not in self._keys and can_fetch:
+                # Keys may have been rotated since the set was cached
+                self._fetch()
+
+            keys = self._keys or {}
+            if kid is None and len(keys) == 1:
+                return next(iter(keys.values()))
+            return keys.get(kid)
+
+    def _load_from_disk(self):
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            if time.time() - cached['fetched_at'] > AUTH_JWKS_CACHE_TTL:
+                return False
+            self._set_keys(cached['jwks'], cached['fetched_at'])
+            return True
+        except Exception:
+            return False
+
+    def _fetch(self):
+        self._last_attempt = time.time()
+        try:
+            if self.session is None:
+                import requests
+                self.session = requests
+            response = self.session.get(self.jwks_url, timeout=self.timeout)
+            response.raise_for_status()
+            jwks = response.json()
+            fetched_at = time.time()
+            self._set_keys(jwks, fetched_at)
+        except Exception as e:
+            # Keep using the previous key set, if any
+            logger.error("Error fetching JWKS", url=self.jwks_url, error=str(e))
+            return
+
+        try:
+            with open(self.cache_path, 'w') as f:
+                json.dump({'fetched_at': fetched_at, 'jwks': jwks}, f)
+        except OSError as e:
+            logger.warning("Error caching JWKS", path=self.cache_path, error=str(e))
+
+    def _set_keys(self, jwks, fetched_at):
+        jwt = _import_jwt()
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            try:
+                keys[jwk.get('kid')] = jwt.PyJWK.from_dict(jwk).key
+            except Exception as e:
+                logger.warning("Skipping unusable JWK", kid=jwk.get('kid'), error=str(e))
+        self._keys = keys
+        self._fetched_at = fetched_at
\ No newline at end of file
@@ -0,0 +1,92 @@
+# src/common/log.py
+
+import json
+import os
+import random
+import sys
+from datetime import datetime, timezone
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+def _parse_sample_rates(value):
+    """
+    Parse "DEBUG=0.1,INFO=0.5" into {10: 0.1, 20: 0.5}. Entries with an
+    unknown level or a rate that isn't a number are skipped with a warning,
+    so a typo in the setting can't stop every handler from starting.
+    """
+    rates = {}
+    for part in filter(None, (part.strip() for part in value.split(','))):
+        level, _, rate = part.partition('=')
+        level = level.strip().upper()
+        try:
+            rates[LEVELS[level]] = float(rate)
+        except (KeyError, ValueError):
+            sys.stderr.write(f"Ignoring LOG_SAMPLE_RATES entry {part!r}: expected one of {', '.join(LEVELS)} with a numeric rate\n")
+    return rates
+
+LOG_LEVEL = LEVELS.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), LEVELS['INFO'])
+LOG_SAMPLE_RATES = _parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', ''))
+
+class Logger:
+    """
+    JSON-lines logger for Lambda handlers.
+    Records below LOG_LEVEL, or dropped by the per-level LOG_SAMPLE_RATES,
+    are discarded before any payload is serialized. Field values may be
+    callables, which are only called when the record is emitted.
+    """
+
+    def __init__(self, name, level=None, sample_rates=None, stream=None):
+        self.name = name
+        self.level = LOG_LEVEL if level is None else level
+        self.sample_rates = LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+        self.stream = stream or sys.stdout
+
+    def is_enabled_for(self, level):
+        """Check whether records at a level would be emitted, ignoring sampling."""
+        return level >= self.level
+
+    def debug(self, message, **fields):
+        self.log(LEVELS['DEBUG'], message, **fields)
+
+    def info(self, message, **fields):
+        self.log(LEVELS['INFO'], message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(LEVELS['WARNING'], message, **fields)
+
+    def error(self, message, **fields):
+        self.log(LEVELS['ERROR'], message, **fields)
+
+    def log(self, level, message, **fields):
+        """
+        Emit a record as one JSON line.
+
+        Args:
+            level: Numeric level from LEVELS
+            message: Short description of the event
+            **fields: Extra values to include; callables are evaluated lazily
+        """
+        if level < self.level:
+            return
+        rate = self.sample_rates.get(level, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return
+
+        record = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'level': next(name for name, value in LEVELS.items() if value == level),
+            'logger': self.name,
+            'message': message
+        }
+        for key, value in fields.items():
+            record[key] = value() if callable(value) else value
+
+        self.stream.write(json.dumps(record, default=str) + '\n')
+
+_loggers = {}
+
+def get_logger(name):
+    """Get the shared logger for a module or handler name."""
+    if name not in _loggers:
+        _loggers[name] = Logger(name)
+    return _loggers[name]
\ No newline at end of file
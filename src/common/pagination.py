@@ -0,0 +1,52 @@
+# src/common/pagination.py
+
+import base64
+import json
+
+CURSOR_VERSION = 1
+
+def encode_cursor(mode, position):
+    """
+    Encode a query position as an opaque, URL-safe cursor string.
+
+    Args:
+        mode: Name of the query path the position belongs to
+        position: JSON serializable position to resume after
+
+    Returns:
+        The cursor string
+    """
+    payload = json.dumps({'v': CURSOR_VERSION, 'm': mode, 'p': position}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def is_sort_pair(position):
+    """Check for a [str, str] sort position, the shape of index and last-modified positions."""
+    return isinstance(position, list) and len(position) == 2 and all(isinstance(value, str) for value in position)
+
+def decode_cursor(cursor, mode, validate=is_sort_pair):
+    """
+    Decode a cursor created by encode_cursor.
+
+    Args:
+        cursor: The cursor string
+        mode: Query path the cursor is expected to belong to
+        validate: Check the position must pass, or None to accept any
+
+    Returns:
+        The position stored in the cursor
+
+    Raises:
+        ValueError: If the cursor is malformed, belongs to another query
+            path or holds a position of the wrong shape
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(payload, dict) or payload.get('v') != CURSOR_VERSION or payload.get('m') != mode:
+        raise ValueError("Invalid cursor")
+    if validate is not None and not validate(payload.get('p')):
+        raise ValueError("Invalid cursor")
+    return payload.get('p')
\ No newline at end of file
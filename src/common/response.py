@@ -0,0 +1,79 @@
+# src/common/response.py
+
+import base64
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+# Bodies smaller than this are sent uncompressed; gzip doesn't pay off for them
+GZIP_MIN_BYTES = int(os.environ.get('RESPONSE_GZIP_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', '5'))
+
+DEFAULT_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def dumps(data):
+    """Serialize data to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+    return json.dumps(data).encode('utf-8')
+
+def accepts_gzip(event):
+    """Check whether the client sent Accept-Encoding: gzip."""
+    headers = (event or {}).get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == 'accept-encoding' and value and 'gzip' in value.lower():
+            return True
+    return False
+
+def parse_json_body(event):
+    """
+    Parse the JSON body of an API Gateway proxy event.
+    Handles bodies that API Gateway base64-encoded because of binary media types.
+    """
+    body = event['body']
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    return json.loads(body)
+
+def build_response(status_code, body, event=None, headers=None):
+    """
+    Build an API Gateway proxy response with a JSON body.
+
+    Args:
+        status_code: HTTP status code
+        body: JSON serializable response body
+        event: The request event, used to negotiate gzip compression
+        headers: Optional headers added to or overriding the defaults
+
+    Returns:
+        Response dictionary for API Gateway
+    """
+    response_headers = {**DEFAULT_HEADERS, **(headers or {})}
+    payload = dumps(body)
+
+    if len(payload) >= GZIP_MIN_BYTES and accepts_gzip(event):
+        response_headers['Content-Encoding'] = 'gzip'
+        response_headers['Vary'] = 'Accept-Encoding'
+        return {
+            'statusCode': status_code,
+            'headers': response_headers,
+            'body': base64.b64encode(gzip.compress(payload, compresslevel=GZIP_LEVEL)).decode('ascii'),
+            'isBase64Encoded': True
+        }
+
+    return {
+        'statusCode': status_code,
+        'headers': response_headers,
+        'body': payload.decode('utf-8')
+    }
\ No newline at end of file
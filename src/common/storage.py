@@ -1,10 +1,154 @@
 # src/common/storage.py
 
-import boto3
 import json
 import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from itertools import islice
+from common.log import get_logger
+
+logger = get_logger(__name__)
+# Number of concurrent S3 requests used when fetching several items at once
+DEFAULT_MAX_WORKERS = int(os.environ.get('STORAGE_MAX_WORKERS', '32'))
+
+# S3 limit on keys per DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+# Item cache kept in the container between warm invocations
+DEFAULT_CACHE_BYTES = int(os.environ.get('STORAGE_CACHE_BYTES', str(32 * 1024 * 1024)))
+DEFAULT_CACHE_TTL = int(os.environ.get('STORAGE_CACHE_TTL', '300'))
+
+def create_s3_client(max_pool_connections):
+    """
+    Create an S3 client straight from a botocore session.
+    boto3 adds resources and transfer helpers this module doesn't use, so
+    skipping it keeps the import, and the Lambda init phase, shorter.
+    """
+    import botocore.session
+    from botocore.config import Config
+    
+    return botocore.session.get_session().create_client(
+        's3',
+        config=Config(max_pool_connections=max_pool_connections)
+    )
+
+# S3 clients are shared by every StorageClient in the container, keyed by pool size
+_shared_s3_clients = {}
+_shared_s3_clients_lock = threading.Lock()
+
+def shared_s3_client(max_pool_connections):
+    """
+    Get the container's S3 client for a connection pool size, creating it
+    on first use. botocore clients are thread-safe, and several handlers
+    loaded by one router would otherwise each build their own.
+    """
+    with _shared_s3_clients_lock:
+        if max_pool_connections not in _shared_s3_clients:
+            _shared_s3_clients[max_pool_connections] = create_s3_client(max_pool_connections)
+        return _shared_s3_clients[max_pool_connections]
+
+# The default item cache is shared the same way, so STORAGE_CACHE_BYTES bounds
+# the whole container rather than each StorageClient
+_shared_item_cache = None
+
+def shared_item_cache():
+    """Get the container's default ItemCache, creating it on first use."""
+    global _shared_item_cache
+    with _shared_s3_clients_lock:
+        if _shared_item_cache is None:
+            _shared_item_cache = ItemCache()
+        return _shared_item_cache
+
+class PreconditionFailed(Exception):
+    """Raised when a conditional write loses to a concurrent writer."""
+
+
+def _error_status(error):
+    """Get the (error code, HTTP status) of a botocore ClientError."""
+    response = getattr(error, 'response', None) or {}
+    return (
+        response.get('Error', {}).get('Code'),
+        response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    )
+
+
+class ItemCache:
+    """
+    Thread-safe LRU cache of raw item bodies and their ETags.
+    Bounded by total body size; entries expire after ttl seconds.
+    """
+    
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, ttl=DEFAULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Get the cached (body, etag) for a key, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, etag, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return body, etag
+    
+    def put(self, key, body, etag):
+        """Store an item body, evicting the least recently used entries as needed."""
+        if not etag or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (body, etag, time.monotonic())
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+    
+    def invalidate(self, key):
+        """Drop a key from the cache."""
+        with self._lock:
+            self._remove(key)
+    
+    def record(self, hit):
+        """Count a cache hit or miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def stats(self):
+        """Get hit/miss counters and current usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self.size
+            }
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+
+def _modified_position(item_meta):
+    """Sort position of an item in last-modified order: [last_modified, key]."""
+    last_modified = item_meta.get('LastModified')
+    return [last_modified.isoformat() if last_modified else '', item_meta['Key']]
+
 
 class StorageClient:
     """
@@ -12,41 +156,168 @@ class StorageClient:
     This replaces the specific s3_operations.py with a more versatile interface.
     """
     
-    def __init__(self, bucket_name=None):
+    def __init__(self, bucket_name=None, max_workers=None, cache=None):
         """
         Initialize the storage client with optional bucket name.
         If not provided, will try to get from environment variables.
+        The connection pool is sized to match max_workers so concurrent
+        fetches don't wait on each other for a connection.
+        Reads go through cache, by default the ItemCache shared by every
+        StorageClient in the container; entries are keyed by bucket and key.
+        The client is kept at module level so the cache survives warm invocations.
+        The S3 client itself is created on first use, not at import time,
+        and is shared with the other StorageClients in the container.
         """
-        self.s3_client = boto3.client('s3')
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.cache = cache or shared_item_cache()
+        self._s3_client = None
         self.bucket_name = bucket_name or os.environ.get('PRIMARY_BUCKET')
         
         if not self.bucket_name:
             raise ValueError("Bucket name must be provided or set in environment variables")
+    
+    @property
+    def s3_client(self):
+        """The S3 client, created the first time it is needed."""
+        if self._s3_client is None:
+            self._s3_client = shared_s3_client(self.max_workers)
+        return self._s3_client
+    
+    @s3_client.setter
+    def s3_client(self, client):
+        self._s3_client = client
 
-    def list_items(self, prefix='', max_items=1000):
-        """List items in the bucket with the given prefix."""
+    def iter_items(self, prefix='', start_after=None, page_size=1000, prefetch=False, end_key=None):
+        """
+        Iterate over the items in the bucket with the given prefix, in key order.
+        Follows continuation tokens so every page of the listing is returned.
+        
+        Args:
+            prefix: Key prefix to list
+            start_after: Optional key to start listing after
+            page_size: Number of keys requested per list call
+            prefetch: Request the next page in the background while the
+                caller is processing the current one
+            end_key: Optional last key to return; listing stops past it
+            
+        Yields:
+            Object metadata dictionaries as returned by list_objects_v2
+        """
+        params = {
+            'Bucket': self.bucket_name,
+            'Prefix': prefix,
+            'MaxKeys': page_size
+        }
+        if start_after:
+            params['StartAfter'] = start_after
+        
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=prefix,
-                MaxKeys=max_items
-            )
-            return response.get('Contents', [])
+            response = self.s3_client.list_objects_v2(**params)
+            while True:
+                next_page = None
+                if response.get('IsTruncated'):
+                    params['ContinuationToken'] = response['NextContinuationToken']
+                    if executor:
+                        next_page = executor.submit(self.s3_client.list_objects_v2, **params)
+                
+                for item_meta in response.get('Contents', []):
+                    if end_key is not None and item_meta['Key'] > end_key:
+                        return
+                    yield item_meta
+                
+                if not response.get('IsTruncated'):
+                    break
+                response = next_page.result() if next_page else self.s3_client.list_objects_v2(**params)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def list_items(self, prefix='', max_items=None, start_after=None, end_key=None):
+        """
+        List items in the bucket with the given prefix.
+        Returns every item across all pages unless max_items is given.
+        start_after and end_key restrict the listing to a key range.
+        """
+        try:
+            return list(islice(
+                self.iter_items(prefix, start_after=start_after, end_key=end_key),
+                max_items
+            ))
         except Exception as e:
-            print(f"Error listing items: {str(e)}")
+            logger.error("Error listing items", prefix=prefix, error=str(e))
             return []
     
     def get_item(self, key):
         """Get an item from the bucket by key."""
+        data, _ = self.get_item_with_etag(key)
+        return data
+    
+    def get_item_with_etag(self, key):
+        """
+        Get an item and its ETag from the bucket by key.
+        Cached items are revalidated with a conditional GET and served
+        from the cache when S3 reports them unchanged.
+        Returns (data, etag), or (None, None) if the item can't be read.
+        """
+        cached = self.cache.get((self.bucket_name, key))
         try:
-            response = self.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=key
-            )
-            return json.loads(response['Body'].read().decode('utf-8'))
+            params = {'Bucket': self.bucket_name, 'Key': key}
+            if cached:
+                params['IfNoneMatch'] = cached[1]
+            
+            try:
+                response = self.s3_client.get_object(**params)
+            except Exception as e:
+                if cached and _error_status(e)[1] == 304:
+                    self.cache.record(hit=True)
+                    body, etag = cached
+                    return json.loads(body.decode('utf-8')), etag
+                raise
+            
+            self.cache.record(hit=False)
+            body = response['Body'].read()
+            etag = response.get('ETag')
+            self.cache.put((self.bucket_name, key), body, etag)
+            return json.loads(body.decode('utf-8')), etag
         except Exception as e:
-            print(f"Error getting item {key}: {str(e)}")
-            return None
+            self.cache.invalidate((self.bucket_name, key))
+            if _error_status(e)[0] in ('NoSuchKey', '404'):
+                logger.debug("Item not found", key=key)
+            else:
+                logger.error("Error getting item", key=key, error=str(e))
+            return None, None
+    
+    def cache_stats(self):
+        """Get hit/miss counters for the item cache."""
+        return self.cache.stats()
+    
+    def get_items(self, keys, deadline=None):
+        """
+        Get several items concurrently.
+        
+        Args:
+            keys: List of keys to fetch
+            deadline: Optional number of seconds allowed for the whole batch
+            
+        Returns:
+            List of items in the same order as keys. Items that could not be
+            fetched, or were still pending when the deadline passed, are None.
+        """
+        keys = list(keys)
+        if not keys:
+            return []
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys)))
+        try:
+            futures = [executor.submit(self.get_item, key) for key in keys]
+            done, not_done = wait(futures, timeout=deadline)
+            if not_done:
+                logger.warning("Deadline reached before all items were fetched", pending=len(not_done), total=len(keys))
+            return [future.result() if future in done else None for future in futures]
+        finally:
+            # Don't block on fetches that are still running past the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def write_item(self, data, key=None):
         """
@@ -58,6 +329,7 @@ class StorageClient:
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
             key = f"items/{timestamp}-{str(uuid.uuid4())}.json"
         
+        self.cache.invalidate((self.bucket_name, key))
         try:
             self.s3_client.put_object(
                 Bucket=self.bucket_name,
@@ -67,11 +339,93 @@ class StorageClient:
             )
             return key
         except Exception as e:
-            print(f"Error writing item: {str(e)}")
+            logger.error("Error writing item", key=key, error=str(e))
+            return None
+    
+    def write_items(self, items, create_only=False):
+        """
+        Write several items concurrently.
+        
+        Args:
+            items: List of (key, data) tuples
+            create_only: Only write keys that don't exist yet; an existing
+                object counts as a failed write and is left unchanged
+            
+        Returns:
+            List with the key of each written item, or None where the
+            write failed, in the same order as items
+        """
+        items = list(items)
+        if not items:
+            return []
+        
+        def write(item):
+            key, data = item
+            if not create_only:
+                return self.write_item(data, key)
+            try:
+                return key if self.write_item_conditional(data, key, etag=None) else None
+            except PreconditionFailed:
+                logger.error("Item already exists", key=key)
+                return None
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(write, items))
+    
+    def write_item_conditional(self, data, key, etag=None):
+        """
+        Write an item only if it hasn't changed since it was read.
+        
+        Args:
+            data: The item data
+            key: The item key
+            etag: ETag the stored object must still have, or None to only
+                write when the key doesn't exist yet
+            
+        Returns:
+            The new ETag, or None if the write failed
+            
+        Raises:
+            PreconditionFailed: If the object was changed or created concurrently
+        """
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        self.cache.invalidate((self.bucket_name, key))
+        try:
+            response = self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=json.dumps(data),
+                ContentType='application/json',
+                **condition
+            )
+            return response.get('ETag')
+        except Exception as e:
+            code, status = _error_status(e)
+            if code in ('PreconditionFailed', 'ConditionalRequestConflict') or status in (409, 412):
+                raise PreconditionFailed(key) from e
+            logger.error("Error writing item", key=key, error=str(e))
             return None
     
-    def update_item(self, key, data):
-        """Update an existing item by key."""
+    def update_item(self, key, data, etag=None):
+        """
+        Update an existing item by key.
+        
+        Args:
+            key: The item key
+            data: The new item data
+            etag: ETag of the version the update was based on. When given,
+                the write is conditional on the item still having it, which
+                also proves it exists, so no separate existence check is made.
+            
+        Returns:
+            The key, or None if the item doesn't exist or the write failed
+            
+        Raises:
+            PreconditionFailed: If etag is given and the item changed since it was read
+        """
+        if etag:
+            return key if self.write_item_conditional(data, key, etag) else None
+        
         try:
             # First check if the item exists
             self.s3_client.head_object(
@@ -82,11 +436,12 @@ class StorageClient:
             # If no exception, update the item
             return self.write_item(data, key)
         except Exception as e:
-            print(f"Error updating item {key}: {str(e)}")
+            logger.error("Error updating item", key=key, error=str(e))
             return None
     
     def delete_item(self, key):
         """Delete an item by key."""
+        self.cache.invalidate((self.bucket_name, key))
         try:
             self.s3_client.delete_object(
                 Bucket=self.bucket_name,
@@ -94,63 +449,189 @@ class StorageClient:
             )
             return True
         except Exception as e:
-            print(f"Error deleting item {key}: {str(e)}")
+            logger.error("Error deleting item", key=key, error=str(e))
             return False
     
-    def query_items(self, prefix='', filter_func=None, start=0, limit=100):
+    def delete_items(self, keys):
+        """
+        Delete several items with multi-object deletes of up to 1,000 keys each.
+        
+        Args:
+            keys: List of keys to delete
+            
+        Returns:
+            List of the keys that could not be deleted
+        """
+        keys = list(keys)
+        for key in keys:
+            self.cache.invalidate((self.bucket_name, key))
+        
+        def delete_batch(batch):
+            try:
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+                errors = response.get('Errors', [])
+                for error in errors:
+                    logger.error("Error deleting item", key=error.get('Key'), error=error.get('Message'))
+                return [error['Key'] for error in errors]
+            except Exception as e:
+                logger.error("Error deleting items", count=len(batch), error=str(e))
+                return batch
+        
+        batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+        if not batches:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            return [key for failed in executor.map(delete_batch, batches) for key in failed]
+    
+    def query_items(self, prefix='', filter_func=None, start=0, limit=100, deadline=None,
+                    sort_by='last_modified', exact_total=True, items=None, start_after=None):
         """
         Query items with prefix and optional filtering.
         Supports pagination with start and limit parameters.
+        Items are fetched concurrently; deadline bounds the time spent fetching.
+        
+        Items are sorted newest first when sort_by is 'last_modified', which
+        needs the full listing, or streamed in key order when sort_by is 'key'.
+        Items modified at the same time are ordered by key, newest key first.
+        Only the objects needed to fill the page are downloaded. With
+        exact_total=False the query stops as soon as the page is full, and
+        total is then a lower bound flagged by total_is_estimate.
+        
+        items can be a pre-selected list of item metadata (at least Key and
+        LastModified) to query instead of listing the whole prefix.
+        
+        The result includes next_position, the position to pass as
+        start_after to continue after this page, or None on the last page.
+        In key order a position is a key; newest first it is the
+        [last_modified, key] pair of the last item returned.
+        
+        If the deadline passes before the page is complete, the query stops
+        there and the result is flagged partial: items holds what was fetched
+        in time and, when filtering, total is a lower bound and has_more is True.
         """
-        items = []
+        end = start + limit
+        deadline_at = time.monotonic() + deadline if deadline is not None else None
+        partial = False
         try:
-            all_items = self.list_items(prefix)
-            
-            # Sort by last modified date (newest first)
-            all_items.sort(key=lambda x: x.get('LastModified', 0), reverse=True)
-            
-            # Apply filtering if provided
-            if filter_func:
-                filtered_items = []
-                for item_meta in all_items:
-                    item_data = self.get_item(item_meta['Key'])
-                    if item_data and filter_func(item_data):
-                        filtered_items.append({
-                            'metadata': item_meta,
-                            'data': item_data
-                        })
-                all_items = filtered_items
+            if sort_by == 'key':
+                position = lambda item_meta: item_meta['Key']
+            else:
+                position = _modified_position
+            
+            if items is not None:
+                all_items = iter(items)
             else:
-                # Get full data for each item
-                all_items_with_data = []
-                for item_meta in all_items:
-                    item_data = self.get_item(item_meta['Key'])
+                # S3 lists in key order, so only a key position can resume the listing itself
+                all_items = self.iter_items(
+                    prefix, start_after=start_after if sort_by == 'key' else None, prefetch=True
+                )
+            
+            if sort_by == 'last_modified':
+                # Sort by last modified date (newest first)
+                all_items = sorted(all_items, key=_modified_position, reverse=True)
+                if start_after:
+                    resume_after = list(start_after)
+                    all_items = (item_meta for item_meta in all_items if _modified_position(item_meta) < resume_after)
+                all_items = iter(all_items)
+            
+            if filter_func is None:
+                # Without a filter every listed key counts, so only the page is fetched
+                if exact_total:
+                    all_items = list(all_items)
+                    total = len(all_items)
+                    page = all_items[start:end]
+                    has_more = end < total
+                else:
+                    page = list(islice(all_items, start, end + 1))
+                    has_more = len(page) > limit
+                    page = page[:limit]
+                    total = start + len(page) + (1 if has_more else 0)
+                
+                last_key = position(page[-1]) if page else None
+                page_data = self.get_items([item_meta['Key'] for item_meta in page], deadline=deadline)
+                timed_out = deadline_at is not None and time.monotonic() >= deadline_at
+                items = []
+                for item_meta, item_data in zip(page, page_data):
+                    if item_data is None and timed_out:
+                        # Not fetched in time; end the page before it so nothing is skipped
+                        partial = True
+                        last_key = position(items[-1]['metadata']) if items else start_after
+                        # The rest of the page is only reachable through next_position
+                        has_more = True
+                        break
                     if item_data:
-                        all_items_with_data.append({
-                            'metadata': item_meta,
-                            'data': item_data
-                        })
-                all_items = all_items_with_data
+                        items.append({'metadata': item_meta, 'data': item_data})
+            else:
+                # The filter needs item data, so fetch in batches until the page is full
+                items = []
+                total = 0
+                last_key = None
+                # Last key whose item was checked against the filter
+                last_checked = start_after
+                while True:
+                    if deadline_at is not None and time.monotonic() >= deadline_at:
+                        # Out of time: stop rather than list on without fetching anything
+                        partial = True
+                        break
+                    
+                    batch = list(islice(all_items, self.max_workers))
+                    if not batch:
+                        break
+                    
+                    remaining = None if deadline_at is None else max(deadline_at - time.monotonic(), 0)
+                    batch_data = self.get_items([item_meta['Key'] for item_meta in batch], deadline=remaining)
+                    timed_out = deadline_at is not None and time.monotonic() >= deadline_at
+                    
+                    for item_meta, item_data in zip(batch, batch_data):
+                        if item_data is None and timed_out:
+                            # Not fetched in time, so it can't be counted as a non-match
+                            partial = True
+                            break
+                        last_checked = position(item_meta)
+                        if item_data and filter_func(item_data):
+                            if start <= total < end:
+                                items.append({'metadata': item_meta, 'data': item_data})
+                                last_key = position(item_meta)
+                            total += 1
+                    
+                    if partial or (total > end and not exact_total):
+                        break
+                has_more = end < total
+                if partial:
+                    # Matches beyond the checked items are unknown
+                    has_more = True
+                    if total <= end:
+                        # Continue after the last checked item; nothing before it was skipped
+                        last_key = last_checked
             
-            # Apply pagination
-            end = min(start + limit, len(all_items))
-            items = all_items[start:end]
+            if partial:
+                logger.warning("Deadline reached before the query finished", prefix=prefix, total=total)
             
             return {
                 'items': items,
-                'total': len(all_items),
+                'total': total,
+                # Without a filter the total comes from the listing, which is complete
+                'total_is_estimate': (partial and filter_func is not None) or (not exact_total and has_more),
+                'partial': partial,
                 'start': start,
                 'limit': limit,
-                'has_more': end < len(all_items)
+                'has_more': has_more,
+                'next_position': last_key if has_more else None
             }
         except Exception as e:
-            print(f"Error querying items: {str(e)}")
+            logger.error("Error querying items", prefix=prefix, error=str(e))
             return {
                 'items': [],
                 'total': 0,
+                'total_is_estimate': False,
+                'partial': False,
                 'start': start,
                 'limit': limit,
                 'has_more': False,
+                'next_position': None,
                 'error': str(e)
             }
     
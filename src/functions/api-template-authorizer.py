@@ -1,42 +1,80 @@
 # src/functions/api-template-authorizer.py
 import json
+import os
+import re
+from functools import lru_cache
 from common.auth import AuthClient
+from common.log import get_logger
 
+logger = get_logger(__name__)
 auth_client = AuthClient()
 
+# What an Allow/Deny policy covers, and so what API Gateway's cached result applies to:
+#   "method" - only the method and resource that was called
+#   "api"    - every method and resource in the API stage
+#   "routes" - the "METHOD/path" routes listed in AUTHORIZED_ROUTES
+POLICY_SCOPE = os.environ.get('POLICY_SCOPE', 'method')
+AUTHORIZED_ROUTES = json.loads(os.environ.get('AUTHORIZED_ROUTES', '[]'))
+
 def handler(event, context):
-    print("Received event:", json.dumps(event, indent=2))  # Debug log
+    logger.debug("Received event", event=event)
     
     # Extract API Key from the Authorization header
     headers = event.get("headers", {})
     api_key = headers.get("Authorization", "")
     
     if api_key == '':
-        print("Empty API Key")
-        return generate_policy('user', 'Deny', event['methodArn'])
+        logger.info("Empty API Key")
+        return generate_policy('user', 'Deny', policy_resources(event['methodArn']))
 
     # Validate the token using the API Key as Bearer token
     is_valid, error, user_data = auth_client.validate_token(api_key)
     
     if not is_valid:
-        print(f"Validation failed: {error}")
-        return generate_policy('user', 'Deny', event['methodArn'])
+        logger.info("Validation failed", error=error)
+        return generate_policy('user', 'Deny', policy_resources(event['methodArn']))
     
     # Extract tenant ID or other context you want to pass to the functions
     tenant_id = user_data.get('tenantId')
-    print(f"TenantId extracted: {tenant_id}") 
+    logger.info("Validation successful", tenant_id=tenant_id)
+    logger.debug("User data", user_data=user_data)
+    return generate_policy('user', 'Allow', policy_resources(event['methodArn']), tenant_id)
 
-    print("Validation successful, user_data:", json.dumps(user_data, indent=2))
-    return generate_policy('user', 'Allow', event['methodArn'], tenant_id)
+def policy_resources(method_arn):
+    """
+    Get the resource ARNs a policy should cover for the configured POLICY_SCOPE.
+    
+    Args:
+        method_arn: The ARN of the method being called, in the form
+            arn:aws:execute-api:{region}:{account}:{api_id}/{stage}/{method}/{path}
+        
+    Returns:
+        A single resource ARN, or a tuple of ARNs
+    """
+    if POLICY_SCOPE == 'method':
+        return method_arn
+    
+    # arn:aws:execute-api:{region}:{account}:{api_id}/{stage}
+    stage_arn = '/'.join(method_arn.split('/', 2)[:2])
+    if POLICY_SCOPE == 'api':
+        return f"{stage_arn}/*/*"
+    
+    # Path parameters such as {id} match any value
+    return tuple(
+        f"{stage_arn}/{re.sub(r'{[^}]+}', '*', route)}"
+        for route in AUTHORIZED_ROUTES
+    ) or method_arn
 
+@lru_cache(maxsize=1024)
 def generate_policy(principal_id, effect, resource, context=None):
     """
     Generate an IAM policy document for API Gateway authorization.
+    Documents are memoized per argument set, so callers must not modify them.
     
     Args:
         principal_id: Identifier for the principal (user)
         effect: 'Allow' or 'Deny'
-        resource: The resource ARN
+        resource: The resource ARN, or a tuple of ARNs
         context: Optional context data to pass to the API
         
     Returns:
@@ -49,7 +87,7 @@ def generate_policy(principal_id, effect, resource, context=None):
             'Statement': [{
                 'Action': 'execute-api:Invoke',
                 'Effect': effect,
-                'Resource': resource
+                'Resource': list(resource) if isinstance(resource, tuple) else resource
             }],
         }
     }
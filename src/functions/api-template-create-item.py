@@ -1,97 +1,133 @@
 # src/functions/api-template-create-item.py
-import json
+import os
 from datetime import datetime
-import uuid
-from common.storage import StorageClient
+from common.storage import StorageClient, PreconditionFailed
+from common.log import get_logger
+from common.response import build_response, parse_json_body
+from common.ids import new_item_id
+from common.index import ItemIndex
 
+logger = get_logger(__name__)
 storage_client = StorageClient()
+item_index = ItemIndex(storage_client)
 
 # Define required fields for your item data
 REQUIRED_FIELDS = ['name', 'description']
 
+# Maximum number of items accepted in one batch request
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', '100'))
+
 def handler(event, context):
     """
     Handle POST requests to create a new item in storage.
+    A JSON array body creates up to MAX_BATCH_ITEMS items in one request;
+    an object body is always a single item, whatever fields it has.
     """
     try:
-        print("Received event:", json.dumps(event, indent=2))  # Debug log
+        logger.debug("Received event", event=event)
         
         # Validate request
         if 'body' not in event:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Invalid request body'})
-            }
+            return build_response(400, {'error': 'Invalid request body'}, event)
 
         # Parse the request body
-        body = json.loads(event['body'])
+        body = parse_json_body(event)
         
         # Get tenant ID from the authorizer context
         tenant_id = None
         if event.get('requestContext', {}).get('authorizer', {}).get('tenantId'):
             tenant_id = event['requestContext']['authorizer']['tenantId']
         
+        # Determine the storage key prefix based on tenant
+        key_prefix = f"tenants/{tenant_id}/" if tenant_id else "items/"
+        
+        if isinstance(body, list):
+            return create_items(event, body, tenant_id, key_prefix)
+        
         # Validate required fields
         is_valid, missing_fields = storage_client.validate_item_data(body, REQUIRED_FIELDS)
         if not is_valid:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': f'Missing required fields: {", ".join(missing_fields)}'})
-            }
+            return build_response(400, {'error': f'Missing required fields: {", ".join(missing_fields)}'}, event)
         
-        # Prepare the item data
-        item_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
+        new_item = build_item(body, tenant_id)
+        key = f"{key_prefix}{new_item['id']}.json"
         
-        new_item = {
-            'id': item_id,
-            'created_at': timestamp,
-            'updated_at': timestamp,
-            'tenant_id': tenant_id,
-            **body  # Include all fields from the request body
-        }
-        
-        # Determine the storage key based on tenant
-        key_prefix = f"tenants/{tenant_id}/" if tenant_id else "items/"
-        key = f"{key_prefix}{item_id}.json"
-        
-        # Save the new item
-        result = storage_client.write_item(new_item, key)
+        # Save the new item; a create never replaces an existing object
+        try:
+            result = storage_client.write_item_conditional(new_item, key, etag=None)
+        except PreconditionFailed:
+            result = None
         
         if result:
-            return {
-                'statusCode': 201,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps(new_item)
-            }
+            if tenant_id:
+                # Keep the tenant's index current so get-items can serve from it
+                item_index.update(key_prefix, upserts=[new_item])
+            
+            return build_response(201, new_item, event)
         else:
-            return {
-                'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Failed to save item'})
-            }
+            return build_response(500, {'error': 'Failed to save item'}, event)
             
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        logger.error("Error processing request", error=str(e))
+        return build_response(500, {'error': str(e)}, event)
+
+def create_items(event, bodies, tenant_id, key_prefix):
+    """
+    Create a batch of items.
+    Every item is validated before anything is written; the writes then run
+    concurrently and the response reports a status for each item.
+    """
+    if not bodies:
+        return build_response(400, {'error': 'No items to create'}, event)
+    if len(bodies) > MAX_BATCH_ITEMS:
+        return build_response(400, {'error': f'A batch can contain at most {MAX_BATCH_ITEMS} items'}, event)
+    
+    # Validate required fields on every item up front
+    errors = []
+    for index, body in enumerate(bodies):
+        if not isinstance(body, dict):
+            errors.append({'index': index, 'error': 'Item must be an object'})
+            continue
+        is_valid, missing_fields = storage_client.validate_item_data(body, REQUIRED_FIELDS)
+        if not is_valid:
+            errors.append({'index': index, 'error': f'Missing required fields: {", ".join(missing_fields)}'})
+    if errors:
+        return build_response(400, {'error': 'Invalid items in batch', 'items': errors}, event)
+    
+    new_items = [build_item(body, tenant_id) for body in bodies]
+    keys = storage_client.write_items(
+        [(f"{key_prefix}{new_item['id']}.json", new_item) for new_item in new_items],
+        create_only=True
+    )
+    
+    results = []
+    created = []
+    for index, (new_item, key) in enumerate(zip(new_items, keys)):
+        if key:
+            created.append(new_item)
+            results.append({'index': index, 'status': 201, 'item': new_item})
+        else:
+            results.append({'index': index, 'status': 500, 'error': 'Failed to save item'})
+    
+    if created and tenant_id:
+        # One index change for the whole batch
+        item_index.update(key_prefix, upserts=created)
+    
+    # 207 Multi-Status when only some of the items were saved
+    status_code = 201 if len(created) == len(new_items) else (207 if created else 500)
+    return build_response(status_code, {'items': results}, event)
+
+def build_item(body, tenant_id):
+    """Prepare a new item from a request body."""
+    # IDs are time-ordered so keys sort by creation time
+    now = datetime.now()
+    timestamp = now.isoformat()
+    
+    return {
+        **body,  # Include all fields from the request body
+        # Generated fields come last so the body can't choose the item's key or owner
+        'id': new_item_id(now),
+        'created_at': timestamp,
+        'updated_at': timestamp,
+        'tenant_id': tenant_id
+    }
\ No newline at end of file
@@ -0,0 +1,124 @@
+# src/functions/api-template-delete-items.py
+import os
+from common.storage import StorageClient, DELETE_BATCH_SIZE
+from common.log import get_logger
+from common.response import build_response, parse_json_body
+from common.index import ItemIndex, LegacyKeyMap, date_filter, list_items_between
+from common.ids import item_id_from_key
+
+logger = get_logger(__name__)
+storage_client = StorageClient()
+item_index = ItemIndex(storage_client)
+legacy_key_map = LegacyKeyMap(storage_client)
+
+# Maximum number of items deleted by one request
+MAX_DELETE_ITEMS = int(os.environ.get('MAX_DELETE_ITEMS', '10000'))
+
+# Select items by date from the per-tenant index instead of scanning every item
+ITEM_INDEX_ENABLED = os.environ.get('ITEM_INDEX_ENABLED', 'true').lower() == 'true'
+
+def handler(event, context):
+    """
+    Handle DELETE requests to remove items from storage.
+    Items can be selected by a path ID, a list of IDs ("ids" in the body,
+    or comma separated in the query string) or a start/end date range.
+    Only items owned by the caller's tenant are deleted. When a date range
+    is given with IDs, requested items outside it are kept and reported.
+    
+    At most MAX_DELETE_ITEMS items are deleted per request; has_more means
+    more selected items remain and the request can be repeated.
+    """
+    try:
+        logger.debug("Received event", event=event)
+
+        query_params = event.get('queryStringParameters', {}) or {}
+        body = parse_json_body(event) if event.get('body') else {}
+        if not isinstance(body, dict):
+            return build_response(400, {'error': 'Invalid request body'}, event)
+
+        # Get tenant ID from the authorizer context
+        tenant_id = None
+        if event.get('requestContext', {}).get('authorizer', {}).get('tenantId'):
+            tenant_id = event['requestContext']['authorizer']['tenantId']
+
+        # Determine the storage key prefix based on tenant
+        key_prefix = f"tenants/{tenant_id}/" if tenant_id else "items/"
+
+        # Collect the explicitly requested item IDs
+        requested_ids = []
+        if (event.get('pathParameters') or {}).get('id'):
+            requested_ids.append(event['pathParameters']['id'])
+        if query_params.get('ids'):
+            requested_ids.extend(item_id.strip() for item_id in query_params['ids'].split(',') if item_id.strip())
+        if isinstance(body.get('ids'), list):
+            requested_ids.extend(str(item_id) for item_id in body['ids'])
+
+        start_date = body.get('start') or query_params.get('start')
+        end_date = body.get('end') or query_params.get('end')
+        # Never delete undated items through a date range
+        in_date_range = date_filter(start_date, end_date, include_undated=False)
+        range_ids = []
+        if in_date_range:
+            if tenant_id and ITEM_INDEX_ENABLED:
+                entries = item_index.load(key_prefix)
+                range_ids.extend(entry['id'] for entry in entries if in_date_range(entry))
+            else:
+                try:
+                    range_items = list_items_between(storage_client, key_prefix, start_date, end_date, legacy_key_map)
+                except ValueError as e:
+                    return build_response(400, {'error': str(e)}, event)
+                range_ids.extend(item_id_from_key(key_prefix, meta['Key']) for meta in range_items)
+
+        if not requested_ids and not in_date_range:
+            return build_response(400, {'error': 'Specify an item ID, a list of IDs or a date range'}, event)
+
+        # Remove duplicates, keeping the request order
+        candidates = list(dict.fromkeys(requested_ids + range_ids))
+        requested = set(requested_ids)
+
+        to_delete = []
+        not_found = []
+        forbidden = []
+        out_of_range = []
+        # Check candidates a batch at a time until the delete cap is reached, so
+        # the cap applies to items that will actually be deleted
+        position = 0
+        while position < len(candidates) and len(to_delete) < MAX_DELETE_ITEMS:
+            batch = candidates[position:position + min(DELETE_BATCH_SIZE, MAX_DELETE_ITEMS - len(to_delete))]
+            position += len(batch)
+
+            # Verify tenant ownership the same way update-item does
+            existing_items = storage_client.get_items(f"{key_prefix}{item_id}.json" for item_id in batch)
+            for item_id, existing_item in zip(batch, existing_items):
+                if not existing_item:
+                    not_found.append(item_id)
+                elif tenant_id and existing_item.get('tenant_id') != tenant_id:
+                    forbidden.append(item_id)
+                elif in_date_range and not in_date_range(existing_item):
+                    # Range candidates come from millisecond key bounds, so only
+                    # explicitly requested items are worth reporting
+                    if item_id in requested:
+                        out_of_range.append(item_id)
+                else:
+                    to_delete.append(item_id)
+        has_more = position < len(candidates)
+
+        failed_keys = set(storage_client.delete_items(f"{key_prefix}{item_id}.json" for item_id in to_delete))
+        failed = [item_id for item_id in to_delete if f"{key_prefix}{item_id}.json" in failed_keys]
+        deleted = [item_id for item_id in to_delete if f"{key_prefix}{item_id}.json" not in failed_keys]
+
+        if deleted and tenant_id:
+            item_index.update(key_prefix, removals=deleted)
+
+        return build_response(200, {
+            'deleted': deleted,
+            'not_found': not_found,
+            'forbidden': forbidden,
+            'out_of_range': out_of_range,
+            'failed': failed,
+            'has_more': has_more
+        }, event)
+
+    except Exception as e:
+        logger.error("Error processing request", error=str(e))
+        return build_response(500, {'error': str(e)}, event)
\ No newline at end of file
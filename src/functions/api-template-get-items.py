@@ -1,17 +1,45 @@
 # src/functions/api-template-get-items.py
-import json
+import os
 from datetime import datetime
 from common.storage import StorageClient
+from common.log import get_logger
+from common.response import build_response
+from common.index import ItemIndex, LegacyKeyMap, date_filter, list_items_between
+from common.pagination import encode_cursor, decode_cursor
 
+logger = get_logger(__name__)
 storage_client = StorageClient()
+item_index = ItemIndex(storage_client)
+legacy_key_map = LegacyKeyMap(storage_client)
+
+# Extra headers sent with every get-items response
+RESPONSE_HEADERS = {'Access-Control-Allow-Credentials': 'true'}
+
+# Serve tenant queries from the per-tenant index instead of scanning every item
+ITEM_INDEX_ENABLED = os.environ.get('ITEM_INDEX_ENABLED', 'true').lower() == 'true'
+
+# Seconds reserved at the end of the invocation to build the response
+DEADLINE_MARGIN = 2
+
+# Maximum number of IDs accepted by one ids= request
+MAX_GET_IDS = int(os.environ.get('MAX_GET_IDS', '100'))
 
 def handler(event, context):
     """
     Handle GET requests to retrieve items from storage.
     Supports filtering by date range and pagination.
+    
+    Pagination uses page/limit, or an opaque cursor: pass an empty cursor
+    for the first page and the returned next_cursor for the following ones.
+    Both return the most recently modified items first, whether or not the
+    tenant item index is used. Cursor pages only fetch the items on the
+    page however deep they are, and only include a total when
+    include_total=true.
+    
+    ids=<id>,<id>,... fetches those items directly instead of listing.
     """
     try:
-        print("Received event:", json.dumps(event, indent=2))  # Debug log
+        logger.debug("Received event", event=event)
         
         # Get query parameters
         query_params = event.get('queryStringParameters', {}) or {}
@@ -19,79 +47,148 @@ def handler(event, context):
         end_date = query_params.get('end')
         page = int(query_params.get('page', '1'))
         limit = int(query_params.get('limit', '10'))
+        cursor = query_params.get('cursor')
+        cursor_mode = cursor is not None
+        include_total = query_params.get('include_total', 'false' if cursor_mode else 'true').lower() == 'true'
         
-        # Calculate pagination start index (0-based)
-        start_index = (page - 1) * limit
+        # Calculate pagination start index (0-based); cursors carry their own position
+        start_index = 0 if cursor_mode else (page - 1) * limit
         
         # Get tenant ID from the authorizer context
         tenant_id = None
         if event.get('requestContext', {}).get('authorizer', {}).get('tenantId'):
             tenant_id = event['requestContext']['authorizer']['tenantId']
         
-        # Define filter function for date range if provided
-        filter_func = None
-        if start_date or end_date:
-            def filter_by_date(item):
-                item_date = item.get('created_at') or item.get('date') or item.get('timestamp')
-                if not item_date:
-                    return True  # If no date field, include by default
-                
-                # Handle date comparisons
-                if start_date and end_date:
-                    return start_date <= item_date <= end_date
-                elif start_date:
-                    return start_date <= item_date
-                elif end_date:
-                    return item_date <= end_date
-                
-                return True
-            
-            filter_func = filter_by_date
+        # Filter by date range if provided; items without a date are included
+        filter_func = date_filter(start_date, end_date)
+        
+        # Stop fetching before the Lambda timeout so we can still respond
+        deadline = None
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            deadline = max(context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN, 0)
+        
+        if query_params.get('ids') is not None:
+            item_ids = [item_id.strip() for item_id in query_params['ids'].split(',') if item_id.strip()]
+            return get_items_by_id(event, item_ids, tenant_id, deadline)
         
-        # Query items from storage
-        prefix = f"tenants/{tenant_id}/" if tenant_id else ""
-        result = storage_client.query_items(
-            prefix=prefix,
-            filter_func=filter_func,
-            start=start_index,
-            limit=limit
-        )
+        # Query items from storage, using the same prefix create-item writes to
+        prefix = f"tenants/{tenant_id}/" if tenant_id else "items/"
+        try:
+            if tenant_id and ITEM_INDEX_ENABLED:
+                cursor_type = 'index'
+                # Index entries carry created_at, so the date filter applies to them directly
+                result = item_index.query(
+                    prefix,
+                    filter_func=filter_func,
+                    start=start_index,
+                    limit=limit,
+                    deadline=deadline,
+                    after=decode_cursor(cursor, cursor_type) if cursor else None
+                )
+            elif cursor_mode:
+                cursor_type = 'modified'
+                # Newest first, like page mode; the cursor holds the last item's
+                # (last modified, key) position and only the page is fetched
+                result = storage_client.query_items(
+                    prefix=prefix,
+                    filter_func=filter_func,
+                    start=start_index,
+                    limit=limit,
+                    deadline=deadline,
+                    exact_total=False,
+                    start_after=decode_cursor(cursor, cursor_type) if cursor else None
+                )
+                include_total = False  # Only known for the remaining items
+            elif tenant_id and (start_date or end_date):
+                cursor_type = None
+                # Only list the keys that can fall within the date range
+                candidates = list_items_between(storage_client, prefix, start_date, end_date, legacy_key_map)
+                
+                result = storage_client.query_items(
+                    prefix=prefix,
+                    filter_func=filter_func,
+                    start=start_index,
+                    limit=limit,
+                    deadline=deadline,
+                    exact_total=include_total,
+                    items=candidates
+                )
+            else:
+                cursor_type = None
+                result = storage_client.query_items(
+                    prefix=prefix,
+                    filter_func=filter_func,
+                    start=start_index,
+                    limit=limit,
+                    deadline=deadline,
+                    exact_total=include_total
+                )
+        except ValueError as e:
+            return build_response(400, {'error': str(e)}, event, RESPONSE_HEADERS)
         
         # Extract just the data for the response
         items = [item['data'] for item in result['items']]
         
+        next_cursor = None
+        if cursor_type and result.get('next_position') is not None:
+            next_cursor = encode_cursor(cursor_type, result['next_position'])
+        
         # Build the response
-        response = {
-            'items': items,
-            'pagination': {
+        if cursor_mode:
+            pagination = {
+                'limit': limit,
+                'has_more': result['has_more'],
+                'next_cursor': next_cursor
+            }
+            if include_total:
+                pagination['total'] = result['total']
+        else:
+            pagination = {
                 'total': result['total'],
+                'total_is_estimate': result['total_is_estimate'],
                 'page': page,
                 'limit': limit,
                 'pages': (result['total'] + limit - 1) // limit,
-                'has_more': result['has_more']
+                'has_more': result['has_more'],
+                'next_cursor': next_cursor
             }
-        }
+        if result.get('partial'):
+            # The request ran out of time before the page was complete
+            pagination['partial'] = True
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Credentials': 'true'
-            },
-            'body': json.dumps(response)
+        response = {
+            'items': items,
+            'pagination': pagination
         }
+        
+        return build_response(200, response, event, RESPONSE_HEADERS)
     
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Credentials': 'true'
-            },
-            'body': json.dumps({
-                'error': str(e)
-            })
-        }
\ No newline at end of file
+        logger.error("Error processing request", error=str(e))
+        return build_response(500, {'error': str(e)}, event, RESPONSE_HEADERS)
+
+def get_items_by_id(event, item_ids, tenant_id, deadline=None):
+    """
+    Fetch known items by ID with one concurrent read per ID.
+    Keys are built the same way update-item builds them, and items owned by
+    another tenant are reported as missing.
+    """
+    item_ids = list(dict.fromkeys(item_ids))
+    if not item_ids:
+        return build_response(400, {'error': 'No item IDs provided'}, event, RESPONSE_HEADERS)
+    if len(item_ids) > MAX_GET_IDS:
+        return build_response(400, {'error': f'At most {MAX_GET_IDS} IDs can be requested at once'}, event, RESPONSE_HEADERS)
+    
+    # Determine the storage key based on tenant
+    key_prefix = f"tenants/{tenant_id}/" if tenant_id else "items/"
+    fetched = storage_client.get_items([f"{key_prefix}{item_id}.json" for item_id in item_ids], deadline=deadline)
+    
+    items = []
+    missing = []
+    for item_id, item in zip(item_ids, fetched):
+        if item is None or (tenant_id and item.get('tenant_id') != tenant_id):
+            missing.append(item_id)
+        else:
+            items.append(item)
+    
+    return build_response(200, {'items': items, 'missing': missing}, event, RESPONSE_HEADERS)
\ No newline at end of file
@@ -0,0 +1,54 @@
+# src/functions/api-template-router.py
+import importlib
+import json
+import os
+import threading
+from common.log import get_logger
+from common.response import build_response
+
+logger = get_logger(__name__)
+
+# Routes served by this function, as {"METHOD /resource": "function"}, where
+# function is a handler in src/functions (e.g. "get-items"). Set by pulumi from
+# the API_ENDPOINTS methods that name this function and a "handler".
+ROUTES = json.loads(os.environ.get('ROUTES', '{}'))
+
+# Used for methods without an explicit route
+DEFAULT_ROUTES = {
+    'GET': 'get-items',
+    'POST': 'create-item',
+    'PUT': 'update-item',
+    'PATCH': 'update-item',
+    'DELETE': 'delete-items'
+}
+
+# Handler file prefix, matching the entrypoint's functions.api-${API_NAME:-template}-*
+HANDLER_PREFIX = f"functions.api-{os.environ.get('API_NAME') or 'template'}-"
+
+# Handler modules are imported the first time one of their routes is called
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+def get_handler(function):
+    """Import a handler module on first use and return its handler."""
+    if function not in _handlers:
+        with _handlers_lock:
+            if function not in _handlers:
+                _handlers[function] = importlib.import_module(f"{HANDLER_PREFIX}{function}").handler
+    return _handlers[function]
+
+def handler(event, context):
+    """
+    Dispatch API Gateway requests to the existing handlers by method and resource,
+    so several routes share one function and its warm containers.
+    """
+    http_method = event.get('httpMethod', '')
+    resource = event.get('resource', '')
+    function = ROUTES.get(f"{http_method} {resource}") or DEFAULT_ROUTES.get(http_method)
+
+    if not function:
+        logger.info("No route for request", method=http_method, resource=resource)
+        return build_response(404, {'error': f'No route for {http_method} {resource}'}, event)
+
+    logger.debug("Routing request", method=http_method, resource=resource, function=function)
+    return get_handler(function)(event, context)
@@ -1,30 +1,30 @@
 # src/functions/api-template-update-item.py
-import json
 from datetime import datetime
-from common.storage import StorageClient
+from common.storage import StorageClient, PreconditionFailed
+from common.log import get_logger
+from common.response import build_response, parse_json_body
+from common.index import ItemIndex
 
+logger = get_logger(__name__)
 storage_client = StorageClient()
+item_index = ItemIndex(storage_client)
 
 def handler(event, context):
     """
     Handle PUT requests to update an existing item in storage.
+    The write is conditional on the ETag read here, so an item changed by
+    a concurrent writer is never overwritten; that case returns 409 with
+    the current version.
     """
     try:
-        print("Received event:", json.dumps(event, indent=2))  # Debug log
+        logger.debug("Received event", event=event)
         
         # Validate request
         if 'body' not in event or 'pathParameters' not in event or 'id' not in event['pathParameters']:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Invalid request. Missing body or item ID'})
-            }
+            return build_response(400, {'error': 'Invalid request. Missing body or item ID'}, event)
 
         # Parse the request body and get the item ID
-        body = json.loads(event['body'])
+        body = parse_json_body(event)
         item_id = event['pathParameters']['id']
         
         # Get tenant ID from the authorizer context
@@ -37,27 +37,13 @@ def handler(event, context):
         key = f"{key_prefix}{item_id}.json"
         
         # Get the existing item
-        existing_item = storage_client.get_item(key)
+        existing_item, etag = storage_client.get_item_with_etag(key)
         if not existing_item:
-            return {
-                'statusCode': 404,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': f'Item with ID {item_id} not found'})
-            }
+            return build_response(404, {'error': f'Item with ID {item_id} not found'}, event)
         
         # Verify tenant ownership if tenant ID is available
         if tenant_id and existing_item.get('tenant_id') != tenant_id:
-            return {
-                'statusCode': 403,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Not authorized to update this item'})
-            }
+            return build_response(403, {'error': 'Not authorized to update this item'}, event)
         
         # Update the item with new data, preserving ID and creation timestamp
         updated_item = {
@@ -70,34 +56,25 @@ def handler(event, context):
         }
         
         # Save the updated item
-        result = storage_client.update_item(key, updated_item)
+        try:
+            result = storage_client.update_item(key, updated_item, etag=etag)
+        except PreconditionFailed:
+            current_item = storage_client.get_item(key)
+            return build_response(409, {
+                'error': f'Item with ID {item_id} was modified by another request',
+                'current': current_item
+            }, event)
         
         if result:
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps(updated_item)
-            }
+            if tenant_id:
+                # Updated items move to the top of the tenant's index; this
+                # records a change object and doesn't read the index
+                item_index.update(key_prefix, upserts=[updated_item])
+            
+            return build_response(200, updated_item, event)
         else:
-            return {
-                'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Failed to update item'})
-            }
+            return build_response(500, {'error': 'Failed to update item'}, event)
             
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        logger.error("Error processing request", error=str(e))
+        return build_response(500, {'error': str(e)}, event)
\ No newline at end of file